@@ -1,13 +1,14 @@
 from flask import Flask
-from flask_bcrypt import Bcrypt
 from flask_migrate import Migrate
 from flask_mail import Mail
 from flask_sqlalchemy import SQLAlchemy
 
+from app.utils.json_provider import create_json_provider
+from app.utils.replicas import configure_replica_binds, init_replicas, RoutingSession
+
 
 # Instantiate extensions
-db = SQLAlchemy()
-bcrypt = Bcrypt()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 mail = Mail()
 migrate = Migrate()
 
@@ -15,11 +16,44 @@ migrate = Migrate()
 def create_app(config_obj=None):
     # Create and configure the application
     app = Flask(__name__)
+    # Defaults for the settings the configuration object may leave out
+    app.config.from_mapping(
+            AUTH_TOKEN_CACHE_SIZE=4096,
+            AUTH_TOKEN_CACHE_TTL=300,
+            BCRYPT_LOG_ROUNDS=12,
+            BCRYPT_HASH_PREFIX="2b",
+            BCRYPT_HANDLE_LONG_PASSWORDS=False,
+            BCRYPT_POOL_SIZE=1,
+            JSON_BACKEND="json",
+            LOGIN_RATE_LIMIT=10,
+            LOGIN_RATE_LIMIT_PERIOD=60,
+            LOGIN_RATE_LIMIT_CACHE_SIZE=100000,
+            PROJECTION_CACHE_SIZE=4096,
+            PROJECTION_CACHE_TTL=3600,
+            TRANSACTION_BATCH_MAX_SIZE=10000,
+            TRANSACTION_ASYNC_SCORING=False,
+            TRANSACTION_ARCHIVE_AFTER_DAYS=365,
+            TRANSFER_BATCH_MAX_SIZE=10000,
+            MAIL_OUTBOX_BATCH_SIZE=100,
+            MAIL_OUTBOX_MAX_ATTEMPTS=5,
+            MAIL_OUTBOX_RETRY_DELAY=30,
+            MAIL_OUTBOX_POLL_INTERVAL=5,
+            SQLALCHEMY_LAZY_LOAD_GUARD=None,
+            SQLALCHEMY_REPLICA_URIS=[],
+            SQLALCHEMY_REPLICA_STICKY_SECONDS=5,
+            SQLALCHEMY_REPLICA_STICKY_COOKIE="db_primary_until",
+            SQLALCHEMY_REPLICA_STICKY_CACHE_SIZE=100000,
+            METRICS_ENABLED=False,
+            METRICS_N_PLUS_ONE_THRESHOLD=10,
+            PROFILER_SLOW_REQUEST_MS=None,
+            PROFILER_INTERVAL_MS=5,
+            PROFILER_DIR=None)
     app.config.from_object(config_obj)
+    app.json = create_json_provider(app)
     
     # Bind the extensions to the application
+    configure_replica_binds(app)
     db.init_app(app)
-    bcrypt.init_app(app)
     mail.init_app(app)
     migrate.init_app(app, db)
 
@@ -31,4 +65,15 @@ def create_app(config_obj=None):
     app.register_blueprint(alert.bp, url_prefix="/api/alerts")    
     app.register_blueprint(transaction.bp, url_prefix="/api/transactions")
 
+    # Send the read-only views to the database replicas
+    init_replicas(app, db)
+
+    # Report relationships loaded lazily instead of explicitly
+    from app.utils.lazyload import init_lazy_load_guard
+    init_lazy_load_guard(app)
+
+    # Opt-in request metrics ('/metrics') and slow request profiling
+    from app.utils.metrics import init_metrics
+    init_metrics(app)
+
     return app
@@ -2,4 +2,4 @@ from flask import Blueprint
 
 bp = Blueprint('alert', __name__)
 
-from app.alert import views  
+from app.alert import commands, views  
@@ -0,0 +1,27 @@
+### IMPORTS ####################################################################
+
+import click
+import time
+
+from flask import current_app
+
+from app.alert import bp
+from app.utils.outbox import dispatch_notifications
+
+
+### COMMANDS ###################################################################
+
+@bp.cli.command("dispatch")
+@click.option("--once", is_flag=True, help="Process a single batch and exit.")
+@click.option("--batch-size", type=int, help="Number of notifications sent per SMTP connection.")
+@click.option("--interval", type=float, help="Seconds to wait when the outbox is empty.")
+def dispatch(once, batch_size, interval):
+    """Send the queued alert emails."""
+    interval = interval or current_app.config["MAIL_OUTBOX_POLL_INTERVAL"]
+    while True:
+        processed = dispatch_notifications(batch_size=batch_size)
+        if once:
+            click.echo(f"Processed {processed} notifications.")
+            break
+        if not processed:
+            time.sleep(interval)
@@ -6,8 +6,9 @@ from marshmallow import ValidationError
                            
 from app.alert import bp  
 from app.models import Alert
-from app.schemas import AlertSchema 
+from app.schemas import alert_schema 
 from app.utils.auth import auth    
+from app.utils.replicas import read_only
 
 
 ### VIEWS ######################################################################  
@@ -16,10 +17,9 @@ from app.utils.auth import auth
 @auth.login_required
 def set_alert():
     request_data = request.get_json()
-    schema = AlertSchema()
     exclude_fields = ("balance_drop_threshold",)
     try:
-        validated_data = schema.load(request_data, partial=exclude_fields)
+        validated_data = alert_schema.load(request_data, partial=exclude_fields)
     except ValidationError as err: 
         if err.messages.get(400):
             response_data = err.messages[400]
@@ -38,10 +38,9 @@ def set_alert():
 @auth.login_required
 def set_balance_drop():
     request_data = request.get_json()
-    schema = AlertSchema()
     exclude_fields = ("target_amount", "alert_threshold")
     try:
-        validated_data = schema.load(request_data, partial=exclude_fields)
+        validated_data = alert_schema.load(request_data, partial=exclude_fields)
     except ValidationError as err:  
         if err.messages.get(400):
             response_data = err.messages.get(400)
@@ -70,8 +69,9 @@ def delete_alert(alert_id):
 
 
 @bp.route("/list")
+@read_only()
 @auth.login_required
 def alert_list():
     user = auth.current_user()
-    response_data = {"data": [alert.generate_json() for alert in user.alerts]}
+    response_data = {"data": Alert.generate_json_list(user=user)}
     return jsonify(response_data) 
@@ -1,12 +1,20 @@
 ### IMPORTS ####################################################################   
 
-from flask import jsonify, request
+from flask import current_app, jsonify, request
 from marshmallow import ValidationError
+from sqlalchemy.exc import IntegrityError
                            
 from app.auth import bp   
 from app.models import User
-from app.schemas import LoginSchema, RegisterSchema, UpdateSchema
-from app.utils.auth import auth
+from app.schemas import login_schema, register_schema, update_schema
+from app.utils.auth import auth, invalidate_tokens, login_rate_limited
+
+
+### HELPERS ####################################################################
+
+def _email_exists():
+    response_data = [{"email": "The email address provided already exists."}]
+    return jsonify(response_data), 400
 
 
 ### VIEWS ######################################################################
@@ -14,16 +22,18 @@ from app.utils.auth import auth
 @bp.route("/register", methods=["POST"])
 def register():
     request_data = request.get_json()
-    schema = RegisterSchema()
     try:
-        validated_data = schema.load(request_data)
+        validated_data = register_schema.load(request_data)
     except ValidationError as err:
         if err.messages.get(400):
             response_data = err.messages[400]
             return jsonify(response_data), 400
     else:
         user = User(**validated_data)
-        user.add()
+        try:
+            user.add()
+        except IntegrityError:
+            return _email_exists()
         response_data = user.generate_json()
         return jsonify(response_data), 201   
 
@@ -31,9 +41,12 @@ def register():
 @bp.route("/login", methods=["POST"])
 def login():
     request_data = request.get_json()
-    schema = LoginSchema()
+    # Throttle the attempts per email before any password is hashed
+    if isinstance(request_data, dict) and login_rate_limited(email=request_data.get("email")):
+        response_data = {"msg": "Too many login attempts. Try again later."}
+        return jsonify(response_data), 429, {"Retry-After": str(current_app.config["LOGIN_RATE_LIMIT_PERIOD"])}
     try:
-        validated_data = schema.load(request_data)
+        validated_data = login_schema.load(request_data)
     except ValidationError as err:
         if err.messages.get(400):
             response_data = err.messages[400]
@@ -51,9 +64,8 @@ def login():
 @auth.login_required
 def update():
     request_data = request.get_json()
-    schema = UpdateSchema()
     try:
-        validated_data = schema.load(request_data)
+        validated_data = update_schema.load(request_data)
     except ValidationError as err:
         if err.messages.get(400):
             response_data = err.messages[400]
@@ -64,7 +76,11 @@ def update():
     else:
         print(validated_data)
         user = auth.current_user() 
-        user.update(**validated_data)
+        try:
+            user.update(**validated_data)
+        except IntegrityError:
+            return _email_exists()
+        invalidate_tokens(user=user)
         response_data = {"msg": "Account updated successfully."}
         return jsonify(response_data)  
     
@@ -73,6 +89,7 @@ def update():
 @auth.login_required
 def unregister():
     user = auth.current_user()
+    invalidate_tokens(user=user)
     user.delete()
     response_data = {"msg": "Account deleted successfully."}
     return jsonify(response_data)
@@ -3,17 +3,28 @@
 
 import calendar
 import jwt
-import statistics
 
 from datetime import datetime, timedelta
+from decimal import Decimal
 from dateutil.relativedelta import relativedelta
-from flask import current_app, render_template
+from flask import current_app, g, has_app_context, render_template
 from flask_mail import Message
-from sqlalchemy import ForeignKey, String
-from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
-from typing import List     
+from sqlalchemy import ForeignKey, Index, inspect, String, Text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Mapped, mapped_column, relationship, selectinload, validates, WriteOnlyMapped
+from sqlalchemy.sql.compiler import InsertmanyvaluesSentinelOpts
+from typing import List, Optional
 
-from app import bcrypt, db, mail 
+from app import db
+from app.utils.metrics import span
+from app.utils.money import cents, Money, to_cents, to_decimal, ZERO
+from app.utils.passwords import check_password, hash_password, password_needs_rehash
+from app.utils.schedule import compile_schedule
+from app.utils.serializers import cents_to_float, format_date, format_timestamp, Serializer
+
+
+# Rows per multi-row INSERT of 'Transaction.add_all', within the bound parameter limits
+INSERT_CHUNK_SIZE = 1000
 
 
 ### MODELS #####################################################################
@@ -25,19 +36,45 @@ class User(db.Model):
     name: Mapped[str] = mapped_column(String(128), nullable=False)
     email: Mapped[str] = mapped_column(String(128), nullable=False, unique=True)
     hashed_password: Mapped[str] = mapped_column(String(128), nullable=False)
-    balance: Mapped[float] = mapped_column(nullable=False, default=0.0)   
+    balance: Mapped[Decimal] = mapped_column(Money, nullable=False, default=ZERO)   
+    # Bumped whenever a recurring expense changes (projection cache key)
+    expenses_version: Mapped[int] = mapped_column(nullable=False, default=0, server_default="0")
+    # Children are never loaded for a delete: 'delete' removes them in bulk
     # Relationship: RecurringExpense
     recurring_expenses: Mapped[List["RecurringExpense"]] = relationship(
             back_populates="user",
-            cascade="all, delete-orphan")  
+            cascade="all, delete-orphan",
+            passive_deletes=True)  
     # Relationship: Alert
     alerts: Mapped[List["Alert"]] = relationship(
             back_populates="user",
-            cascade="all, delete-orphan")  
-    # Relationship: Transaction
-    transactions: Mapped[List["Transaction"]] = relationship(
+            cascade="all, delete-orphan",
+            passive_deletes=True)  
+    # Relationship: Transaction (write-only: the history is read through queries)
+    transactions: WriteOnlyMapped["Transaction"] = relationship(
+            back_populates="user",
+            cascade="all, delete-orphan",
+            passive_deletes=True)  
+    # Relationship: Notification (write-only)
+    notifications: WriteOnlyMapped["Notification"] = relationship(
             back_populates="user",
-            cascade="all, delete-orphan")  
+            cascade="all, delete-orphan",
+            passive_deletes=True)
+    # Relationship: SpendingStatistics
+    spending_statistics: Mapped["SpendingStatistics"] = relationship(
+            back_populates="user",
+            cascade="all, delete-orphan",
+            passive_deletes=True)
+    # Relationship: SpendingBucket (write-only)
+    spending_buckets: WriteOnlyMapped["SpendingBucket"] = relationship(
+            back_populates="user",
+            cascade="all, delete-orphan",
+            passive_deletes=True)
+
+    @validates("balance")
+    def validate_balance(self, _, value):
+        """Transform the 'balance' field into a Decimal of whole cents."""
+        return value if value is None else to_decimal(value)
 
     @property
     def password(self):
@@ -45,33 +82,66 @@ class User(db.Model):
 
     @password.setter
     def password(self, value):
-        self.hashed_password = bcrypt.generate_password_hash(value).decode('UTF-8') 
+        with span("bcrypt_hash"):
+            self.hashed_password = hash_password(value)
 
     def __repr__(self):
         return f"{type(self).__name__}(id='{self.id}', name='{self.name}')"
 
     def add(self):
         db.session.add(self)
-        db.session.commit()   
-
-    def _avg_spending(self):
-        spendings = [transaction.amount for transaction in self.transactions]
-        return statistics.mean(spendings) if spendings else 0
+        # The unique constraint on 'email' rejects duplicate accounts
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            raise
+
+    def _bump_expenses_version(self):
+        # Incremented in SQL so that concurrent changes aren't lost
+        self.expenses_version = type(self).expenses_version + 1
+
+    def debit(self, amount=None):
+        """Subtract 'amount' from the balance with an atomic UPDATE (the caller commits).
+
+        Returns the balance before and after the debit. The updated row stays
+        locked until the commit, so concurrent debits of the same user can't
+        overwrite each other: debiting before inserting the user's rows runs
+        the concurrent writers of the user one at a time.
+        """
+        stmt = (db.update(type(self))
+                .filter(type(self).id == self.id)
+                .values(balance=type(self).balance - amount)
+                .execution_options(synchronize_session=False))
+        db.session.execute(stmt)
+        db.session.refresh(self, attribute_names=["balance"])
+        return self.balance + amount, self.balance
 
     def delete(self):
+        for model in (Transaction, TransactionArchive, SpendingBucket, SpendingStatistics, Notification, Alert, RecurringExpense):
+            db.session.execute(db.delete(model).filter(model.user_id == self.id))
         db.session.delete(self)
         db.session.commit()
 
     @classmethod
     def filter_users_by(cls, email=None):  
         if email:
+            # Users found are remembered for the rest of the request, as the
+            # auth validators and views look the same email up several times
+            users = g.setdefault("users_by_email", {}) if has_app_context() else {}
+            user = users.get(email)
+            if user is not None and user.email == email and not inspect(user).detached:
+                return user
             stmt = db.select(cls).filter(cls.email == email)
-            return db.session.execute(stmt).scalar()  
+            user = db.session.execute(stmt).scalar()  
+            if user is not None:
+                users[email] = user
+            return user
 
     @staticmethod
-    def _generate_following_months(num_months=12):
-        dt_now = datetime.utcnow()
-        return [dt_now + relativedelta(months=i) for i in range(1, num_months + 1)]  
+    def _following_month():
+        dt_next = datetime.utcnow() + relativedelta(months=1)
+        return dt_next.year, dt_next.month
 
     def generate_json(self):
         data = {}
@@ -84,55 +154,48 @@ class User(db.Model):
         data = {}
         exp = datetime.utcnow() + timedelta(days=expiration_days)
         data["token"] = jwt.encode(
-                    payload={"email": self.email, "exp": exp},
+                    payload={"id": self.id, "email": self.email, "exp": exp},
                     key=current_app.config["SECRET_KEY"],
                     algorithm="HS256")
         return data    
 
-    def notify(self, initial_balance=None, final_balance=None):
-        if initial_balance and final_balance:
-            balance_dropped_by = abs(final_balance - initial_balance)
-            for alert in self.alerts:
+    def notify(self, balance_drop=None):
+        if balance_drop:
+            balance_dropped_by = abs(balance_drop)
+            for alert in Alert.filter_alerts_by(user=self):
                 alert_balance_drop_threshold = alert.balance_drop_threshold
                 if balance_dropped_by > alert_balance_drop_threshold:
-                    self._send_email(alert_balance=alert_balance_drop_threshold)
+                    self._queue_email(alert_balance=alert_balance_drop_threshold)
                     break  
 
-    def projection(self):
+    def projection(self, months=12):
+        # Recurring expense of every following month, one row per expense
+        year, month = self._following_month()
+        matrix = [expense.monthly_amounts(year=year, month=month, months=months) for expense in RecurringExpense.filter_expenses_by(user=self)]
+        monthly_expenses = [sum(column, ZERO) for column in zip(*matrix)] if matrix else [ZERO] * months
         balance = self.balance
-        yearly_projection = []
-        for date in self._generate_following_months():
+        projection = []
+        for i, monthly_expense in enumerate(monthly_expenses):
             monthly_projection = {}
-            monthly_projection["month"] = date.strftime("%Y-%m")
-            monthly_projection["recurring_expense"] = 0.0
-            for expense in self.recurring_expenses:
-                monthly_projection["recurring_expense"] += expense.expected_amount_in(year=date.year, month=date.month)
-            balance = round(balance - monthly_projection["recurring_expense"], 2)
+            monthly_projection["month"] = f"{year + (month - 1 + i) // 12:04d}-{(month - 1 + i) % 12 + 1:02d}"
+            # Whole cents throughout, so no rounding error builds up over the months
+            balance = balance - monthly_expense
             monthly_projection["expected_balance"] = balance
-            monthly_projection["recurring_expense"] = round(monthly_projection["recurring_expense"], 2)
-            yearly_projection.append(monthly_projection)
-        return yearly_projection
-
-    def _send_email(self, alert_balance=None):
-        msg = Message(
+            monthly_projection["recurring_expense"] = monthly_expense
+            projection.append(monthly_projection)
+        return projection
+
+    def _queue_email(self, alert_balance=None):
+        # Sent by the outbox worker once committed with the balance update
+        notification = Notification(
+                recipient=self.email,
                 subject="CaixaBank: Balance Drop Alert",
-                recipients=[self.email],
                 body=render_template(
                     "mail/balance_drop_alert.txt",
                     user_name=self.name,
-                    alert_balance_drop_threshold=alert_balance))
-        mail.send(msg)  
-
-    def _standard_deviation(self, date=None, period=90):
-        max_date = date
-        min_date = date - relativedelta(days=period)
-        transactions = self.transactions
-        sample = (t.amount for t in transactions if t.timestamp >= min_date and t.timestamp < max_date)
-        try:
-            sd = statistics.stdev(sample)
-        except statistics.StatisticsError:
-            sd = 0
-        return sd   
+                    alert_balance_drop_threshold=alert_balance),
+                user_id=self.id)
+        db.session.add(notification)
 
     def update(self, balance=None, email=None, password=None):
         if balance:
@@ -141,11 +204,21 @@ class User(db.Model):
             self.email = email
         if password:
             self.password = password
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            raise
                     
     def verify_password(self, password=None):
         if password:
-            return bcrypt.check_password_hash(self.hashed_password, password) 
+            with span("bcrypt_check"):
+                verified = check_password(self.hashed_password, password)
+            # Rehash transparently when BCRYPT_LOG_ROUNDS has changed
+            if verified and password_needs_rehash(self.hashed_password):
+                self.password = password
+                db.session.commit()
+            return verified
 
 
 class RecurringExpense(db.Model):
@@ -153,7 +226,7 @@ class RecurringExpense(db.Model):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     expense_name: Mapped[str] = mapped_column(String(255), nullable=False)
-    amount: Mapped[float]
+    amount: Mapped[Decimal] = mapped_column(Money)
     frequency: Mapped[str] = mapped_column(String(50), nullable=False, default="monthly")
     start_date: Mapped[datetime] = mapped_column(nullable=False)
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
@@ -164,44 +237,62 @@ class RecurringExpense(db.Model):
     @validates("start_date")
     def validate_start_date(self, _, value):
         """Transform the 'start_date' field into a 'datetime' object."""
+        if isinstance(value, datetime):
+            return value
         return datetime.strptime(value, "%Y-%m-%d") 
 
+    @validates("amount")
+    def validate_amount(self, _, value):
+        """Transform the 'amount' field into a Decimal of whole cents."""
+        return value if value is None else to_decimal(value)
+
     def __repr__(self):
         return f"{type(self).__name__}(id='{self.id}', user_id='{self.user_id}')"      
 
     def add(self):
         db.session.add(self)
+        self.user._bump_expenses_version()
         db.session.commit() 
 
     def delete(self):
         db.session.delete(self)
+        self.user._bump_expenses_version()
         db.session.commit()
 
-    def expected_amount_in(self, month=None, year=None):
-        start_day = self.start_date.day
-        start_month = self.start_date.month
+    def monthly_amounts(self, year=None, month=None, months=12):
+        """Return the expected amount of each of the 'months' months starting at 'year'-'month'."""
+        schedule = compile_schedule(frequency=self.frequency, start_date=self.start_date)
+        if schedule.frequency != "monthly":
+            return [count * self.amount for count in schedule.monthly_counts(year=year, month=month, months=months)]
+        # Monthly expenses are prorated over the days left in their start month
         start_year = self.start_date.year
-        if (year, month) < (start_year, start_month):
-            return 0.00
-        elif (year, month) == (start_year, start_month):
-            # Number of days in the month corresponding to 'start_date'
-            _, num_days = calendar.monthrange(start_year, start_month)
-            #
-            initial_date = datetime(start_year, start_month, start_day)
-            final_date = initial_date + relativedelta(months=1)
-            final_date = datetime(final_date.year, final_date.month, 1)
-            # Number of days left till the end of the month
-            lapse = final_date - initial_date
-            days = lapse.days if lapse.days else 1
-            return days * self.amount / num_days
-        elif (year, month) > (start_year, start_month):
-            return self.amount
+        start_month = self.start_date.month
+        # Position of the start month among the requested months
+        offset = (start_year - year) * 12 + (start_month - month)
+        if offset < 0:
+            return [self.amount] * months
+        if offset >= months:
+            return [ZERO] * months
+        # Number of days in the month corresponding to 'start_date'
+        _, num_days = calendar.monthrange(start_year, start_month)
+        # Number of days left till the end of the month
+        days = num_days - self.start_date.day + 1
+        return [ZERO] * offset + [to_decimal(days * self.amount / num_days)] + [self.amount] * (months - offset - 1)
 
     @classmethod
     def filter_expenses_by(cls, id=None, user=None):
         if id and user:
             stmt = db.select(cls).filter(cls.id == id, cls.user_id == user.id)
             return db.session.execute(stmt).scalar()
+        if user:
+            stmt = db.select(cls).filter(cls.user_id == user.id).order_by(cls.id)
+            return db.session.execute(stmt).scalars().all()
+
+    @classmethod
+    def generate_json_list(cls, user=None):
+        """Serialize the user's recurring expenses straight from their columns."""
+        stmt = db.select(cls).filter(cls.user_id == user.id).order_by(cls.id)
+        return recurring_expense_serializer.dump_all(db.session.execute(recurring_expense_serializer.select(stmt)))
 
     def generate_json(self):
         data = {}
@@ -209,7 +300,7 @@ class RecurringExpense(db.Model):
         data["expense_name"] = self.expense_name
         data["amount"] = self.amount
         data["frequency"] = self.frequency
-        data["start_date"] = self.start_date.strftime("%Y-%m-%d")
+        data["start_date"] = format_date(self.start_date)
         return data 
 
     def update(self, expense_name=None, amount=None, frequency=None, start_date=None):
@@ -221,6 +312,7 @@ class RecurringExpense(db.Model):
             self.frequency = frequency
         if start_date:
             self.start_date = start_date  
+        self.user._bump_expenses_version()
         db.session.commit()  
 
 
@@ -228,14 +320,19 @@ class Alert(db.Model):
     __tablename__ = "alerts"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    target_amount: Mapped[float] = mapped_column(nullable=False, default=0.0)
-    alert_threshold: Mapped[float] = mapped_column(nullable=False, default=0.0)
-    balance_drop_threshold: Mapped[float] = mapped_column(nullable=False, default=0.0)
+    target_amount: Mapped[Decimal] = mapped_column(Money, nullable=False, default=ZERO)
+    alert_threshold: Mapped[Decimal] = mapped_column(Money, nullable=False, default=ZERO)
+    balance_drop_threshold: Mapped[Decimal] = mapped_column(Money, nullable=False, default=ZERO)
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
     # Relationship: User
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
     user: Mapped["User"] = relationship(back_populates="alerts")
 
+    @validates("target_amount", "alert_threshold", "balance_drop_threshold")
+    def validate_amounts(self, _, value):
+        """Transform the amount fields into Decimals of whole cents."""
+        return value if value is None else to_decimal(value)
+
     def __repr__(self):
         return f"{type(self).__name__}(id='{self.id}', user_id='{self.user_id}')"  
 
@@ -252,6 +349,15 @@ class Alert(db.Model):
         if id and user:
             stmt = db.select(cls).filter(cls.id == id, cls.user_id == user.id)
             return db.session.execute(stmt).scalar()  
+        if user:
+            stmt = db.select(cls).filter(cls.user_id == user.id).order_by(cls.id)
+            return db.session.execute(stmt).scalars().all()
+
+    @classmethod
+    def generate_json_list(cls, user=None):
+        """Serialize the user's alerts straight from their columns."""
+        stmt = db.select(cls).filter(cls.user_id == user.id).order_by(cls.id)
+        return alert_serializer.dump_all(db.session.execute(alert_serializer.select(stmt)))
 
     def generate_json(self, exclude_fields=None):
         data = {}
@@ -271,78 +377,361 @@ class Alert(db.Model):
         return data  
 
 
-class Transaction(db.Model):
+class TransactionHistoryMixin:
+    """Queries and serialization shared by the hot and archived transactions."""
+
+    @classmethod
+    def filter_transaction_by(cls, id=None, user=None):
+        if id and user:
+            stmt = db.select(cls).filter(cls.id == id, cls.user_id == user.id)
+            return db.session.execute(stmt).scalar()
+
+    @classmethod
+    def filter_transactions_by(cls, user=None, cursor=None, category=None, fraud=None, start=None, end=None):
+        """Build the query of the user's transactions, newest first, after the '(timestamp, id)' cursor."""
+        stmt = db.select(cls).filter(cls.user_id == user.id)
+        if cursor:
+            timestamp, id = cursor
+            stmt = stmt.filter(db.or_(cls.timestamp < timestamp, db.and_(cls.timestamp == timestamp, cls.id < id)))
+        if category:
+            stmt = stmt.filter(cls.category == category)
+        if fraud is not None:
+            stmt = stmt.filter(cls.fraud == fraud)
+        if start:
+            stmt = stmt.filter(cls.timestamp >= start)
+        if end:
+            stmt = stmt.filter(cls.timestamp < end)
+        return stmt.order_by(cls.timestamp.desc(), cls.id.desc())
+
+    def generate_json(self):
+        data = {}
+        data["id"] = self.id
+        data["user_id"] = self.user_id
+        data["amount"] = self.amount
+        data["category"] = self.category
+        data["timestamp"] = format_timestamp(self.timestamp)
+        data["fraud"] = self.fraud if self.scored else "pending"
+        return data
+
+
+class Transaction(TransactionHistoryMixin, db.Model):
     __tablename__ = "transactions"
+    __table_args__ = (
+            Index("ix_transactions_user_id_timestamp", "user_id", "timestamp"),
+            Index("ix_transactions_user_id_category_timestamp", "user_id", "category", "timestamp"),
+            Index("ix_transactions_scored_id", "scored", "id"),
+            # Ids are never handed out again, even once moved to the archive
+            {"sqlite_autoincrement": True})
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    amount: Mapped[float] = mapped_column(nullable=False)
+    amount: Mapped[Decimal] = mapped_column(Money, nullable=False)
     category: Mapped[str] = mapped_column(String(255), nullable=False)
     timestamp: Mapped[datetime] = mapped_column(default=datetime.utcnow)
     fraud: Mapped[bool] = mapped_column(default=False)  
+    # False while queued for background fraud scoring
+    scored: Mapped[bool] = mapped_column(default=True, server_default=db.true())
     # Relationship: User
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
-    user: Mapped["User"] = relationship(back_populates="transactions")   
+    # Never lazy loaded: set on creation or loaded with 'selectinload'
+    user: Mapped["User"] = relationship(back_populates="transactions", lazy="raise_on_sql")   
 
     @validates("timestamp")
     def validate_timestamp(self, _, value):
         """Transform the 'timestamp' field into a 'datetime' object."""
+        if isinstance(value, datetime):
+            return value
         return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")  
 
+    @validates("amount")
+    def validate_amount(self, _, value):
+        """Transform the 'amount' field into a Decimal of whole cents."""
+        return value if value is None else to_decimal(value)
+
     def __repr__(self):
-        return f"{type(self).__name__}(id='{self.id}', user_id='{self.user.id}')"  
+        return f"{type(self).__name__}(id='{self.id}', user_id='{self.user_id}')"  
 
-    def add(self):
+    def add(self, commit=True):
+        if self.timestamp is None:
+            self.timestamp = datetime.utcnow()
         db.session.add(self)
-        db.session.commit()  
+        # Keep the user's spending aggregates in step with the insert
+        SpendingStatistics.record(user=self.user, amounts=(self.amount,))
+        SpendingBucket.record(user=self.user, amounts=(self.amount,), timestamp=self.timestamp)
+        if commit:
+            db.session.commit()  
 
-    def comply_with(self, fraud_rule=None):
-        user = self.user
-        final_timestamp = self.timestamp
-        category = self.category
-
-        # Fraud Detection Rule 1:
-        if fraud_rule == 1:
-            standard_deviation = user._standard_deviation(date=final_timestamp)  
-            return True if self.amount > 3 * standard_deviation else False
-
-        # Fraud Detection Rule 2:
-        if fraud_rule == 2:
-            initial_timestamp = final_timestamp - relativedelta(days=180)
-            similar_transactions = []
-            for transaction in type(self)._filter_transactions_by(category=category, user=user):
-                if final_timestamp > transaction.timestamp and initial_timestamp <= transaction.timestamp:
-                    similar_transactions.append(transaction)
-            return True if not similar_transactions else False    
-
-        # Fraud Detection Rule 3:
-        if fraud_rule == 3:
-            initial_timestamp = final_timestamp - relativedelta(minutes=5)
-            recurrent_transactions = []
-            recurrent_spendings = []
-            for transaction in user.transactions:
-                if final_timestamp > transaction.timestamp and initial_timestamp <= transaction.timestamp:
-                    recurrent_transactions.append(transaction)
-            for transaction in recurrent_transactions:
-                recurrent_spendings.append(transaction.amount)
-            return True if len(recurrent_transactions) > 3 and sum(recurrent_spendings) > user._avg_spending() else False      
+    @classmethod
+    def add_all(cls, user=None, transactions=()):
+        """Insert the user's transactions with bulk INSERTs and set their ids (the caller debits the user first and commits)."""
+        rows = []
+        amounts_by_day = {}
+        for transaction in transactions:
+            rows.append({
+                "user_id": user.id,
+                "amount": transaction.amount,
+                "category": transaction.category,
+                "timestamp": transaction.timestamp,
+                "fraud": bool(transaction.fraud),
+                "scored": True})
+            amounts_by_day.setdefault(SpendingBucket.day_of(transaction.timestamp), []).append(transaction.amount)
+        if not rows:
+            return
+        stmt = db.insert(cls)
+        dialect = db.session.get_bind().dialect
+        # Batched only with an autoincrement sentinel (e.g. PostgreSQL): one INSERT per row otherwise
+        if (dialect.insert_executemany_returning_sort_by_parameter_order
+                and dialect.insertmanyvalues_implicit_sentinel & InsertmanyvaluesSentinelOpts.ANY_AUTOINCREMENT):
+            ids = db.session.scalars(stmt.returning(cls.id, sort_by_parameter_order=True), rows).all()
+        else:
+            # No batched ordered RETURNING (e.g. MySQL, SQLite): multi-row INSERTs, then
+            # the ids read back in one keyed SELECT. The caller debited the user first,
+            # so no other transaction of the user is inserted in the meantime.
+            last_id = db.session.execute(db.select(db.func.max(cls.id))).scalar() or 0
+            for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+                db.session.execute(stmt.values(rows[i:i + INSERT_CHUNK_SIZE]))
+            ids = db.session.execute(
+                    db.select(cls.id).filter(cls.user_id == user.id, cls.id > last_id).order_by(cls.id)).scalars().all()
+        for transaction, id in zip(transactions, ids):
+            transaction.id = id
+        # Keep the user's spending aggregates in step with the insert
+        SpendingStatistics.record(user=user, amounts=[row["amount"] for row in rows])
+        for day, amounts in amounts_by_day.items():
+            SpendingBucket.record(user=user, amounts=amounts, timestamp=day)
 
     @classmethod
-    def _filter_transactions_by(cls, category=None, user=None):
-        if category and user:
-            stmt = db.select(cls).filter(cls.category == category, cls.user_id == user.id)
-            return db.session.execute(stmt).scalars() 
+    def filter_transactions_by(cls, fraud=None, **filters):
+        stmt = super().filter_transactions_by(fraud=fraud, **filters)
+        # Transactions queued for scoring ("pending") are neither fraud nor legitimate yet
+        return stmt if fraud is None else stmt.filter(cls.scored == db.true())
 
-    def generate_json(self):
-        data = {}
-        data["id"] = self.id
-        data["user_id"] = self.user_id
-        data["amount"] = self.amount
-        data["category"] = self.category
-        data["timestamp"] = self.timestamp.strftime("%Y-%m-%dT%H:%M:%SZ")
-        data["fraud"] = self.fraud
-        return data    
+    @classmethod
+    def filter_pending(cls, limit=100):
+        """Lock and return the oldest transactions queued for fraud scoring."""
+        stmt = (db.select(cls)
+                .options(selectinload(cls.user))
+                .filter(cls.scored == db.false())
+                .order_by(cls.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True))
+        return db.session.execute(stmt).scalars().all()
+
+    @classmethod
+    def archive(cls, before=None, limit=1000):
+        """Move up to 'limit' scored transactions older than 'before' to the archive (the caller commits).
+
+        Returns the number of transactions moved.
+        """
+        stmt = (db.select(cls.id)
+                .filter(cls.timestamp < before, cls.scored == db.true())
+                .order_by(cls.id)
+                .limit(limit))
+        ids = db.session.execute(stmt).scalars().all()
+        if ids:
+            columns = ("id", "amount", "category", "timestamp", "fraud", "user_id")
+            db.session.execute(db.insert(TransactionArchive).from_select(
+                    columns, db.select(*(getattr(cls, column) for column in columns)).filter(cls.id.in_(ids))))
+            db.session.execute(db.delete(cls).filter(cls.id.in_(ids)).execution_options(synchronize_session=False))
+        return len(ids)
+
+    @classmethod
+    def filter_history_by(cls, user=None, limit=None, **filters):
+        """Build the query of the user's hot and archived transactions as 'transaction_serializer' rows, newest first."""
+        stmt = transaction_serializer.select(cls.filter_transactions_by(user=user, **filters))
+        # The archive is always queried in the same statement: its index seek
+        # ends at once for ranges newer than the user's archived transactions
+        archived = archived_transaction_serializer.select(TransactionArchive.filter_transactions_by(user=user, **filters))
+        if limit:
+            # Each table contributes at most a page, read through its own index
+            stmt, archived = stmt.limit(limit), archived.limit(limit)
+        history = db.union_all(stmt.subquery().select(), archived.subquery().select()).subquery()
+        stmt = db.select(*history.c).order_by(history.c.timestamp.desc(), history.c.id.desc())
+        return stmt.limit(limit) if limit else stmt
 
     def update(self, fraud=False):
         if fraud:
             self.fraud = fraud
-            db.session.commit()                
+            db.session.commit()
+
+
+class TransactionArchive(TransactionHistoryMixin, db.Model):
+    """Scored transactions older than TRANSACTION_ARCHIVE_AFTER_DAYS, moved out of the hot table.
+
+    Archived transactions keep their id, and the user's spending aggregates
+    keep counting them.
+    """
+    __tablename__ = "transactions_archive"
+    __table_args__ = (
+            Index("ix_transactions_archive_user_id_timestamp", "user_id", "timestamp"),
+            Index("ix_transactions_archive_user_id_category_timestamp", "user_id", "category", "timestamp"))
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    amount: Mapped[Decimal] = mapped_column(Money, nullable=False)
+    category: Mapped[str] = mapped_column(String(255), nullable=False)
+    timestamp: Mapped[datetime] = mapped_column()
+    fraud: Mapped[bool] = mapped_column(default=False)
+    # Relationship: User
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+
+    # Only scored transactions are archived
+    scored = True
+
+    def __repr__(self):
+        return f"{type(self).__name__}(id='{self.id}', user_id='{self.user_id}')"
+
+    @staticmethod
+    def cutoff(days=None):
+        """Start of the day 'days' days ago: the transactions before it are archived."""
+        return SpendingBucket.day_of(datetime.utcnow() - timedelta(days=days))
+
+
+class SpendingAggregateMixin:
+    """Running count, total and sum of squares of transaction amounts, in one row per key."""
+
+    @classmethod
+    def _add_amounts(cls, amounts=(), **key):
+        """Add the amounts to the row of the 'key' columns, creating it if needed."""
+        count = len(amounts)
+        total = sum(amounts, ZERO)
+        sum_squares = float(sum(to_cents(amount) ** 2 for amount in amounts))
+        stmt = (db.update(cls)
+                .filter(*(getattr(cls, column) == value for column, value in key.items()))
+                .values(
+                    count=cls.count + count,
+                    total=cls.total + total,
+                    sum_squares=cls.sum_squares + sum_squares))
+        if not db.session.execute(stmt).rowcount:
+            try:
+                with db.session.begin_nested():
+                    db.session.add(cls(**key, count=count, total=total, sum_squares=sum_squares))
+            except IntegrityError:
+                # Created by a concurrent transaction in the meantime
+                db.session.execute(stmt)
+
+
+class SpendingStatistics(SpendingAggregateMixin, db.Model):
+    __tablename__ = "spending_statistics"
+
+    count: Mapped[int] = mapped_column(nullable=False, default=0)
+    total: Mapped[Decimal] = mapped_column(Money, nullable=False, default=ZERO)
+    # Sum of the squared amounts in cents
+    sum_squares: Mapped[float] = mapped_column(nullable=False, default=0.0)
+    # Relationship: User
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    user: Mapped["User"] = relationship(back_populates="spending_statistics")
+
+    def __repr__(self):
+        return f"{type(self).__name__}(user_id='{self.user_id}', count='{self.count}')"
+
+    @classmethod
+    def record(cls, user=None, amounts=()):
+        """Add transaction amounts to the user's running aggregates."""
+        cls._add_amounts(amounts=amounts, user_id=user.id)
+
+
+class SpendingBucket(SpendingAggregateMixin, db.Model):
+    __tablename__ = "spending_buckets"
+
+    day: Mapped[datetime] = mapped_column(primary_key=True)
+    count: Mapped[int] = mapped_column(nullable=False, default=0)
+    total: Mapped[Decimal] = mapped_column(Money, nullable=False, default=ZERO)
+    # Sum of the squared amounts in cents
+    sum_squares: Mapped[float] = mapped_column(nullable=False, default=0.0)
+    # Relationship: User
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    user: Mapped["User"] = relationship(back_populates="spending_buckets")
+
+    def __repr__(self):
+        return f"{type(self).__name__}(user_id='{self.user_id}', day='{self.day}')"
+
+    @staticmethod
+    def day_of(timestamp):
+        return datetime(timestamp.year, timestamp.month, timestamp.day)
+
+    @classmethod
+    def record(cls, user=None, amounts=(), timestamp=None):
+        """Add transaction amounts to the user's bucket for the day of 'timestamp'."""
+        cls._add_amounts(amounts=amounts, user_id=user.id, day=cls.day_of(timestamp))
+
+
+class Notification(db.Model):
+    __tablename__ = "notifications"
+    __table_args__ = (
+            Index("ix_notifications_status_next_attempt_at", "status", "next_attempt_at"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    recipient: Mapped[str] = mapped_column(String(128), nullable=False)
+    subject: Mapped[str] = mapped_column(String(255), nullable=False)
+    body: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(nullable=False, default=0)
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+    next_attempt_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+    sent_at: Mapped[Optional[datetime]]
+    # Relationship: User
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+    user: Mapped["User"] = relationship(back_populates="notifications")
+
+    def __repr__(self):
+        return f"{type(self).__name__}(id='{self.id}', status='{self.status}')"
+
+    @classmethod
+    def filter_pending(cls, limit=100):
+        """Lock and return the pending notifications that are due."""
+        stmt = (db.select(cls)
+                .filter(cls.status == "pending", cls.next_attempt_at <= datetime.utcnow())
+                .order_by(cls.next_attempt_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True))
+        return db.session.execute(stmt).scalars().all()
+
+    def generate_message(self):
+        return Message(subject=self.subject, recipients=[self.recipient], body=self.body)
+
+    def mark_failed(self, error=None, max_attempts=5, retry_delay=30):
+        """Schedule another attempt with exponential backoff, or give up after 'max_attempts'."""
+        self.attempts += 1
+        self.last_error = error
+        if self.attempts >= max_attempts:
+            self.status = "failed"
+        else:
+            self.next_attempt_at = datetime.utcnow() + timedelta(seconds=retry_delay * 2 ** (self.attempts - 1))
+
+    def mark_sent(self):
+        self.attempts += 1
+        self.status = "sent"
+        self.sent_at = datetime.utcnow()
+
+
+### SERIALIZERS ################################################################
+
+# Same dictionaries as 'generate_json', dumped from column tuples for the list responses
+recurring_expense_serializer = Serializer(
+        id=RecurringExpense.id,
+        expense_name=RecurringExpense.expense_name,
+        amount=(cents(RecurringExpense.amount), cents_to_float),
+        frequency=RecurringExpense.frequency,
+        start_date=(RecurringExpense.start_date, format_date))
+
+alert_serializer = Serializer(
+        id=Alert.id,
+        user_id=Alert.user_id,
+        target_amount=(cents(Alert.target_amount), cents_to_float),
+        alert_threshold=(cents(Alert.alert_threshold), cents_to_float),
+        balance_drop_threshold=(cents(Alert.balance_drop_threshold), cents_to_float))
+
+def _transaction_serializer(model, fraud):
+    return Serializer(
+            id=model.id,
+            user_id=model.user_id,
+            amount=(cents(model.amount), cents_to_float),
+            category=model.category,
+            timestamp=(model.timestamp, format_timestamp),
+            fraud=(fraud, lambda fraud: "pending" if fraud is None else bool(fraud)))
+
+
+# NULL while the transaction waits for fraud scoring
+transaction_serializer = _transaction_serializer(Transaction, db.case((Transaction.scored, Transaction.fraud)))
+
+# Same keys and formats: the rows of both tables are dumped alike
+archived_transaction_serializer = _transaction_serializer(TransactionArchive, TransactionArchive.fraud)
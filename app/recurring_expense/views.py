@@ -1,28 +1,31 @@
 ### IMPORTS ####################################################################
 
-from flask import jsonify, request
+from datetime import datetime
+from flask import current_app, jsonify, request
 from marshmallow import ValidationError
 
 from app.models import RecurringExpense
 from app.recurring_expense import bp 
-from app.schemas import RecurringExpenseSchema  
+from app.schemas import projection_schema, recurring_expense_schema  
 from app.utils.auth import auth
+from app.utils.cache import app_cache
+from app.utils.replicas import read_only
 
 
 ### VIEWS ######################################################################
 
 @bp.route("", methods=["GET", "POST"])
+@read_only("GET")
 @auth.login_required
 def create_recurring_expense():
     user = auth.current_user()
     if request.method == "GET":  
-        response_data = [expense.generate_json() for expense in user.recurring_expenses]
+        response_data = RecurringExpense.generate_json_list(user=user)
         return jsonify(response_data) 
     if request.method == "POST":
         request_data = request.get_json()
-        schema = RecurringExpenseSchema()
         try:
-            validated_data = schema.load(request_data)
+            validated_data = recurring_expense_schema.load(request_data)
         except ValidationError as err:
             if err.messages.get(400):
                 response_data = err.messages[400]
@@ -48,9 +51,8 @@ def update_recurring_expense(expense_id):
             return jsonify(response_data)
         if request.method == "PUT":
             request_data = request.get_json()
-            schema = RecurringExpenseSchema()
             try:
-                validated_data = schema.load(request_data)
+                validated_data = recurring_expense_schema.load(request_data)
             except ValidationError as err:
                 if err.messages.get(400):
                     response_data = err.messages[400]
@@ -66,8 +68,26 @@ def update_recurring_expense(expense_id):
 
 
 @bp.route('/projection')
+@read_only()
 @auth.login_required
 def projection():
-    user = auth.current_user()
-    response_data = user.projection() 
-    return jsonify(response_data)       
+    try:
+        validated_data = projection_schema.load(request.args)
+    except ValidationError as err:
+        if err.messages.get(400):
+            response_data = err.messages[400]
+            return jsonify(response_data), 400
+    else:
+        user = auth.current_user()
+        months = validated_data["months"]
+        # The projection only changes with the recurring expenses, the balance and the current month
+        cache = app_cache(
+                "projection",
+                maxsize=current_app.config["PROJECTION_CACHE_SIZE"],
+                ttl=current_app.config["PROJECTION_CACHE_TTL"])
+        key = (user.id, user.expenses_version, user.balance, months, datetime.utcnow().strftime("%Y-%m"))
+        response_data = cache.get(key)
+        if response_data is None:
+            response_data = user.projection(months=months)
+            cache.set(key, response_data)
+        return jsonify(response_data)       
@@ -1,17 +1,21 @@
 
 ### IMPORTS ####################################################################
 
+import base64
+import binascii
+
 from datetime import datetime
+from decimal import Decimal, ROUND_HALF_EVEN
 from marshmallow import (
         fields,
         Schema as BaseSchema,
-        validates,
         validates_schema,
         ValidationError)
-from marshmallow.validate import Email, Length
+from marshmallow.validate import Email, Length, OneOf, Range
 
 from app.models import User
-from app.utils.currency import ExchangeRate
+from app.utils.currency import cross_rates
+from app.utils.schedule import FREQUENCIES
 
 
 ### CUSTOM VALIDATION CLASSES ##################################################   
@@ -50,12 +54,39 @@ class PositiveNumber:
         self._status_code = status_code
 
     def __call__(self, value):
-        if not isinstance(value, float):
-            raise Exception(f"{type(self).__name__} validator is applied only to fields of type float.")
+        if not isinstance(value, (float, Decimal)):
+            raise Exception(f"{type(self).__name__} validator is applied only to fields of type float or decimal.")
         if value <= 0:
             raise ValidationError({"status_code": self._status_code, "message": self._message})
 
 
+### CUSTOM FIELDS #############################################################
+
+class Amount(fields.Decimal):
+    """Amount of money, loaded as a Decimal of whole cents."""
+
+    def __init__(self, **kwargs):
+        super().__init__(places=2, rounding=ROUND_HALF_EVEN, **kwargs)
+
+
+class Cursor(fields.Field):
+    """Opaque pagination cursor wrapping a '(timestamp, id)' position."""
+
+    default_error_messages = {"invalid": "Invalid cursor."}
+
+    @staticmethod
+    def encode(timestamp, id):
+        value = f"{timestamp.strftime('%Y-%m-%dT%H:%M:%S.%f')}|{id}"
+        return base64.urlsafe_b64encode(value.encode()).decode()
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        try:
+            timestamp, id = base64.urlsafe_b64decode(value.encode()).decode().split("|")
+            return datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%S.%f"), int(id)
+        except (binascii.Error, UnicodeError, ValueError):
+            raise self.make_error("invalid")
+
+
 ### BASE SCHEMA ################################################################
 
 class Schema(BaseSchema):
@@ -64,20 +95,29 @@ class Schema(BaseSchema):
         """Generate custom validation error messages."""
         if err.messages:
             errors = {}
-            for field_name in err.messages:
-                for err_message in err.messages[field_name]:
-                    try:
-                        status_code = err_message.get("status_code")
-                    except AttributeError:
-                        status_code = 400
-                    if status_code not in errors:
-                        errors[status_code] = []
-                    try:
-                        errors[status_code].append({field_name: err_message["message"]})
-                    except TypeError:
-                        errors[status_code].append({field_name: err_message})
+            self._collect_errors(errors, err.messages)
             raise ValidationError(errors)
 
+    @classmethod
+    def _collect_errors(cls, errors, messages, prefix=""):
+        """Group the error messages by status code."""
+        for field_name in messages:
+            # Errors of 'many=True' loads are nested under the item index
+            if isinstance(messages[field_name], dict):
+                cls._collect_errors(errors, messages[field_name], prefix=f"{prefix}{field_name}.")
+                continue
+            for err_message in messages[field_name]:
+                try:
+                    status_code = err_message.get("status_code")
+                except AttributeError:
+                    status_code = 400
+                if status_code not in errors:
+                    errors[status_code] = []
+                try:
+                    errors[status_code].append({f"{prefix}{field_name}": err_message["message"]})
+                except TypeError:
+                    errors[status_code].append({f"{prefix}{field_name}": err_message})
+
 
 ### SCHEMAS: AUTHENTICATION ####################################################
                                                     
@@ -91,14 +131,13 @@ class RegisterSchema(Schema):
             validate=[
                 EmptyString(allow=False),
                 Length(max=128),
-                Email(),
-                EmailAddress(exist=False)]) 
+                Email()]) 
 
     password = fields.String(
             required=True,
             validate=[EmptyString(allow=False), Length(max=128)])  
 
-    balance = fields.Float(required=True)  
+    balance = Amount(required=True)  
 
 
 class LoginSchema(Schema): 
@@ -131,8 +170,7 @@ class UpdateSchema(Schema):
             validate=[
                 EmptyString(allow=False),
                 Length(max=128),
-                Email(),
-                EmailAddress(exist=False)]) 
+                Email()]) 
 
     password = fields.String(
             required=False,
@@ -156,20 +194,21 @@ class RecurringExpenseSchema(Schema):
             required=True,
             validate=[EmptyString(allow=False), Length(max=255)])
 
-    amount = fields.Float(required=True, validate=[PositiveNumber()])
+    amount = Amount(required=True, validate=[PositiveNumber()])
 
     frequency = fields.String(
             required=False,
-            validate=[EmptyString(allow=False), Length(max=50)]) 
+            validate=[EmptyString(allow=False), Length(max=50), OneOf(FREQUENCIES)]) 
 
-    start_date = fields.String(required=True)
+    # Parsed once here: the model receives the 'datetime'
+    start_date = fields.DateTime(
+            required=True,
+            format="%Y-%m-%d",
+            error_messages={"invalid": "Date format must be 'yyyy-mm-dd' (e.g. '2024-03-16')."})
 
-    @validates("start_date")
-    def validate_start_date(self, value):
-        try:
-            datetime.strptime(value, "%Y-%m-%d")
-        except ValueError:
-            raise ValidationError("Date format must be 'yyyy-mm-dd' (e.g. '2024-03-16').")    
+
+class ProjectionSchema(Schema):
+    months = fields.Integer(load_default=12, validate=[Range(min=1, max=120)])
 
 
 ### SCHEMAS: TRANSFERS #########################################################
@@ -185,45 +224,97 @@ class TransferSchema(Schema):
 
     amount = fields.Float(required=True, validate=[PositiveNumber()])  
     
-    @validates_schema
-    def validate_currency(self, data, **kwargs):
-        exchange_rates = ExchangeRate()  
-        source_currencies = exchange_rates.source_currencies
-        target_currencies = exchange_rates.target_currencies 
+    @validates_schema(pass_many=True)
+    def validate_currency(self, data, many, **kwargs):
+        # Each distinct pair is checked once, however many items share it
+        items = data if many else [data]
+        pair_errors = {}
+        errors = {}
+        for i, item in enumerate(items):
+            pair = (item.get("source_currency"), item.get("target_currency"))
+            if pair not in pair_errors:
+                pair_errors[pair] = self._currency_errors(*pair)
+            if pair_errors[pair]:
+                if not many:
+                    raise ValidationError(pair_errors[pair])
+                errors[i] = pair_errors[pair]
+        if errors:
+            raise ValidationError(errors)
+
+    @staticmethod
+    def _currency_errors(source_currency, target_currency):
+        currencies = cross_rates.currencies
+        if source_currency not in currencies:
+            return {"source_currency": [{"status_code": 404, "message": "Non-supported currency."}]}
+        if target_currency not in currencies:
+            return {"target_currency": [{"status_code": 404, "message": "Non-supported currency."}]}
+        if cross_rates.filter_by(source_currency=source_currency, target_currency=target_currency) is None:
+            return {"target_currency": [{"status_code": 404, "message": "No exchange rate available for this currency pair."}]}
 
-        source_currency = data.get("source_currency")
-        target_currency = data.get("target_currency")
-                                                         
-        if source_currency not in source_currencies:
-            raise ValidationError({"source_currency": [{"status_code": 404, "message": "Non-supported currency."}]})  
-        if target_currency not in target_currencies:
-            raise ValidationError({"target_currency": [{"status_code": 404, "message": "Non-supported currency."}]})     
+
+class TransferBatchQuerySchema(Schema):
+    format = fields.String(load_default="json", validate=[OneOf(("json", "ndjson"))])
 
 
 ### SCHEMAS: ALERTS ############################################################
 
 class AlertSchema(Schema):
-    target_amount = fields.Float(required=True, validate=[PositiveNumber()])
+    target_amount = Amount(required=True, validate=[PositiveNumber()])
 
-    alert_threshold = fields.Float(required=True, validate=[PositiveNumber()])
+    alert_threshold = Amount(required=True, validate=[PositiveNumber()])
 
-    balance_drop_threshold = fields.Float(required=True, validate=[PositiveNumber()])
+    balance_drop_threshold = Amount(required=True, validate=[PositiveNumber()])
 
 
 ### SCHEMAS: TRANSACTIONS ######################################################
 
 class TransactionSchema(Schema):
-    amount = fields.Float(required=True, validate=[PositiveNumber()])
+    amount = Amount(required=True, validate=[PositiveNumber()])
 
     category = fields.String(
             required=True,
             validate=[EmptyString(allow=False)])
 
-    timestamp = fields.String(required=False)
+    # Parsed once here: the model receives the 'datetime'
+    timestamp = fields.DateTime(
+            required=False,
+            format="%Y-%m-%dT%H:%M:%SZ",
+            error_messages={"invalid": "Date format must be 'yyyy-mm-ddThh:mm:ssZ' (e.g. '2024-03-16T17:34:41Z')."})
+
 
-    @validates("timestamp")
-    def validate_timestamp(self, value): 
-        try:
-            datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")
-        except ValueError:
-            raise ValidationError("Date format must be 'yyyy-mm-ddThh:mm:ssZ' (e.g. '2024-03-16T17:34:41Z').")                                                                  
+class TransactionQuerySchema(Schema):
+    limit = fields.Integer(load_default=50, validate=[Range(min=1, max=1000)])
+
+    cursor = Cursor(required=False)
+
+    category = fields.String(required=False)
+
+    fraud = fields.Boolean(required=False)
+
+    start = fields.DateTime(
+            required=False,
+            format="%Y-%m-%dT%H:%M:%SZ",
+            error_messages={"invalid": "Date format must be 'yyyy-mm-ddThh:mm:ssZ' (e.g. '2024-03-16T17:34:41Z')."})
+
+    end = fields.DateTime(
+            required=False,
+            format="%Y-%m-%dT%H:%M:%SZ",
+            error_messages={"invalid": "Date format must be 'yyyy-mm-ddThh:mm:ssZ' (e.g. '2024-03-16T17:34:41Z')."})
+
+    format = fields.String(load_default="json", validate=[OneOf(("json", "ndjson"))])
+
+
+### SCHEMA INSTANCES ###########################################################
+
+# Schemas keep no per-load state: every request shares these instances
+# ('many' and 'partial' are passed to 'load')
+register_schema = RegisterSchema()
+login_schema = LoginSchema()
+update_schema = UpdateSchema()
+recurring_expense_schema = RecurringExpenseSchema()
+projection_schema = ProjectionSchema()
+transfer_schema = TransferSchema()
+transfer_batch_query_schema = TransferBatchQuerySchema()
+alert_schema = AlertSchema()
+transaction_schema = TransactionSchema()
+transaction_query_schema = TransactionQuerySchema()
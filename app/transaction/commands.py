@@ -0,0 +1,75 @@
+### IMPORTS ####################################################################
+
+import click
+import json
+import time
+
+from datetime import timedelta
+from flask import current_app
+from marshmallow import ValidationError
+
+from app import db
+from app.models import Transaction, TransactionArchive, User
+from app.schemas import transaction_schema
+from app.transaction import bp
+from app.utils.fraud import fraud_engine
+from app.utils.ingestion import ingest_transactions, score_pending_transactions
+
+
+### COMMANDS ###################################################################
+
+@bp.cli.command("import")
+@click.argument("file", type=click.File())
+@click.option("--email", required=True, help="Email address of the account the transactions belong to.")
+@click.option("--batch-size", default=1000, show_default=True, help="Number of transactions committed at once.")
+def import_transactions(file, email, batch_size):
+    """Import the transactions of a JSON array file."""
+    user = User.filter_users_by(email=email)
+    if not user:
+        raise click.ClickException("The email address provided doesn't exist.")
+    try:
+        validated_data = transaction_schema.load(json.load(file), many=True)
+    except ValidationError as err:
+        raise click.ClickException(json.dumps(err.messages))
+    imported = fraud = 0
+    for i in range(0, len(validated_data), batch_size):
+        transactions = [Transaction(**item, user_id=user.id) for item in validated_data[i:i + batch_size]]
+        ingest_transactions(user, transactions)
+        imported += len(transactions)
+        fraud += sum(transaction.fraud for transaction in transactions)
+    click.echo(f"Imported {imported} transactions ({fraud} flagged as fraud).")
+
+
+@bp.cli.command("score")
+@click.option("--once", is_flag=True, help="Process a single batch and exit.")
+@click.option("--batch-size", default=100, show_default=True, help="Number of transactions scored per database transaction.")
+@click.option("--interval", default=1.0, show_default=True, help="Seconds to wait when the queue is empty.")
+def score(once, batch_size, interval):
+    """Evaluate for fraud the transactions added asynchronously."""
+    while True:
+        scored = score_pending_transactions(batch_size=batch_size)
+        if once:
+            click.echo(f"Scored {scored} transactions.")
+            break
+        if not scored:
+            time.sleep(interval)
+
+
+@bp.cli.command("archive")
+@click.option("--batch-size", default=1000, show_default=True, help="Number of transactions moved per database transaction.")
+def archive(batch_size):
+    """Move the transactions older than TRANSACTION_ARCHIVE_AFTER_DAYS to the archive table."""
+    days = current_app.config["TRANSACTION_ARCHIVE_AFTER_DAYS"]
+    period = max((getattr(aggregate, "period", timedelta(0)) for aggregate in fraud_engine.aggregates), default=timedelta(0))
+    # Shorter would move rows the fraud windows of new transactions still read
+    if timedelta(days=days) < period:
+        raise click.ClickException(f"TRANSACTION_ARCHIVE_AFTER_DAYS must be at least the fraud rules' longest window ({period.days} days).")
+    before = TransactionArchive.cutoff(days=days)
+    archived = 0
+    while True:
+        moved = Transaction.archive(before=before, limit=batch_size)
+        db.session.commit()
+        archived += moved
+        if moved < batch_size:
+            break
+    click.echo(f"Archived {archived} transactions older than {before:%Y-%m-%d}.")
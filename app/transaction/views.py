@@ -1,13 +1,22 @@
 
 ### IMPORTS ####################################################################
 
-from flask import jsonify, request
+from flask import current_app, jsonify, request, Response, stream_with_context
 from marshmallow import ValidationError
 
-from app.models import Transaction
+from app import db
+from app.models import Transaction, TransactionArchive, transaction_serializer
 from app.transaction import bp   
-from app.schemas import TransactionSchema   
+from app.schemas import Cursor, transaction_query_schema, transaction_schema   
 from app.utils.auth import auth   
+from app.utils.ingestion import ingest_transaction, ingest_transactions
+from app.utils.replicas import read_only
+
+
+### HELPERS ####################################################################
+
+def _is_true(value):
+    return value if isinstance(value, bool) else value.lower() in ("1", "true", "yes")
 
 
 ### VIEWS ######################################################################
@@ -16,33 +25,103 @@ from app.utils.auth import auth
 @auth.login_required
 def add_transaction():
     request_data = request.get_json()
-    schema = TransactionSchema()
     try:
-        validated_data = schema.load(request_data)
+        validated_data = transaction_schema.load(request_data)
     except ValidationError as err:
         if err.messages.get(400):
             response_data = err.messages[400]
             return jsonify(response_data), 400
     else:
-        # Add the transaction to the database
         user = auth.current_user()
         transaction = Transaction(**validated_data, user=user)
-        transaction.add()
+        # Add and charge the transaction straight away and queue it for fraud scoring
+        if request.args.get("async", default=current_app.config["TRANSACTION_ASYNC_SCORING"], type=_is_true):
+            ingest_transaction(user, transaction, score=False)
+            response_data = {
+                    "msg": "Transaction added and queued for fraud evaluation.",
+                    "data": transaction.generate_json()}
+            return jsonify(response_data), 202
+        # Score, add and charge the transaction in a single database transaction
+        ingest_transaction(user, transaction)
+        response_data = {
+                "msg": "Transaction added and evaluated for fraud.",
+                "data": transaction.generate_json()}
+        return jsonify(response_data), 201
+
+
+@bp.route("/<int:transaction_id>", methods=["GET"])
+@read_only()
+@auth.login_required
+def get_transaction(transaction_id):
+    user = auth.current_user()
+    transaction = (Transaction.filter_transaction_by(id=transaction_id, user=user)
+                   or TransactionArchive.filter_transaction_by(id=transaction_id, user=user))
+    if transaction:
+        response_data = {"data": transaction.generate_json()}
+        return jsonify(response_data)
+    response_data = {"msg": "Transaction not found."}
+    return jsonify(response_data), 404
+
+
+@bp.route("/batch", methods=["POST"])
+@auth.login_required
+def add_transactions():
+    request_data = request.get_json()
+    try:
+        validated_data = transaction_schema.load(request_data, many=True)
+    except ValidationError as err:
+        if err.messages.get(400):
+            response_data = err.messages[400]
+            return jsonify(response_data), 400
+    else:
+        if not validated_data:
+            response_data = {"msg": "At least one transaction is required."}
+            return jsonify(response_data), 400
+        if len(validated_data) > current_app.config["TRANSACTION_BATCH_MAX_SIZE"]:
+            response_data = {"msg": f"At most {current_app.config['TRANSACTION_BATCH_MAX_SIZE']} transactions are allowed per batch."}
+            return jsonify(response_data), 413
+        # Score, add and charge the whole batch at once
+        user = auth.current_user()
+        transactions = [Transaction(**item, user_id=user.id) for item in validated_data]
+        ingest_transactions(user, transactions)
+        response_data = {
+                "msg": "Transactions added and evaluated for fraud.",
+                "data": [transaction.generate_json() for transaction in transactions]}
+        return jsonify(response_data), 201
 
-        # Mark the transaction as fraud if it complies with at least one of the fraud detection rules
-        if transaction.comply_with(fraud_rule=1) or transaction.comply_with(fraud_rule=2) or transaction.comply_with(fraud_rule=3):
-            transaction.update(fraud=True) 
 
-        # Notify the user if the user's balance drops by more that chosen threshold
-        balance_before_transaction = user.balance
-        balance_after_transaction = balance_before_transaction - transaction.amount
-        user.notify(
-                initial_balance=balance_before_transaction,
-                final_balance=balance_after_transaction)
+@bp.route("", methods=["GET"])
+@read_only()
+@auth.login_required
+def list_transactions():
+    try:
+        validated_data = transaction_query_schema.load(request.args)
+    except ValidationError as err:
+        if err.messages.get(400):
+            response_data = err.messages[400]
+            return jsonify(response_data), 400
+    else:
+        user = auth.current_user()
+        limit = validated_data.pop("limit")
+        response_format = validated_data.pop("format")
 
-        # Update the user's balance
-        user.update(balance=balance_after_transaction)
+        # Stream the whole history from a server-side cursor, one JSON object per line
+        if response_format == "ndjson":
+            stmt = Transaction.filter_history_by(user=user, **validated_data)
+
+            def generate():
+                rows = db.session.execute(stmt.execution_options(yield_per=1000))
+                for row in rows:
+                    yield current_app.json.dumps(transaction_serializer.dump(row)) + "\n"
+            return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+        # Keyset pagination: fetch one extra row to know whether there is a next page
+        rows = db.session.execute(Transaction.filter_history_by(user=user, limit=limit + 1, **validated_data)).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = Cursor.encode(rows[-1].timestamp, rows[-1].id)
         response_data = {
-                "msg": "Transaction added and evaluated for fraud.",
-                "data": transaction.generate_json()}
-        return jsonify(response_data), 201   
+                "data": transaction_serializer.dump_all(rows),
+                "next_cursor": next_cursor}
+        return jsonify(response_data)
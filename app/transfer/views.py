@@ -1,26 +1,27 @@
                                 
 ### IMPORTS ####################################################################
 
-from flask import jsonify, request
+from flask import current_app, jsonify, request, Response, stream_with_context
 from marshmallow import ValidationError
                            
-from app.schemas import TransferSchema                 
+from app.schemas import transfer_batch_query_schema, transfer_schema
 from app.transfer import bp  
 from app.utils.auth import auth
-from app.utils.currency import ExchangeFee, ExchangeRate  
+from app.utils.currency import cross_rates
+from app.utils.replicas import read_only
               
 
-### IMPORTS ####################################################################   
+### VIEWS ######################################################################
 
 @bp.route('/fees')
+@read_only()
 @auth.login_required
 def return_exchange_fee():
     request_data = {}
     request_data["source_currency"] = request.args.get("source_currency")
     request_data["target_currency"] = request.args.get("target_currency")
-    schema = TransferSchema() 
     try:
-        validated_data = schema.load(request_data, partial=("amount",))
+        validated_data = transfer_schema.load(request_data, partial=("amount",))
     except ValidationError as err:  
         if err.messages.get(400):
             response_data = err.messages[400]
@@ -29,8 +30,7 @@ def return_exchange_fee():
             response_data = err.messages[404] 
             return jsonify(response_data), 404
     else:
-        exchange_fees = ExchangeFee()
-        exchange_fee = exchange_fees.filter_by(
+        _, exchange_fee = cross_rates.filter_by(
                 source_currency=validated_data["source_currency"],
                 target_currency=validated_data["target_currency"])
         response_data = {"exchangeFee": exchange_fee}
@@ -38,14 +38,14 @@ def return_exchange_fee():
 
 
 @bp.route("/rates")
+@read_only()
 @auth.login_required
 def return_exchange_rate():
     request_data = {}
     request_data["source_currency"] = request.args.get("source_currency")
     request_data["target_currency"] = request.args.get("target_currency")
-    schema = TransferSchema()
     try:
-        validated_data = schema.load(request_data, partial=("amount",))
+        validated_data = transfer_schema.load(request_data, partial=("amount",))
     except ValidationError as err:  
         if err.messages.get(400):
             response_data = err.messages[400]
@@ -54,8 +54,7 @@ def return_exchange_rate():
             response_data = err.messages[404] 
             return jsonify(response_data), 404
     else:
-        exchange_rates = ExchangeRate()
-        exchange_rate = exchange_rates.filter_by(
+        exchange_rate, _ = cross_rates.filter_by(
                 source_currency=validated_data["source_currency"],
                 target_currency=validated_data["target_currency"])
         response_data = {"exchangeRate": exchange_rate}
@@ -63,12 +62,12 @@ def return_exchange_rate():
 
 
 @bp.route("/simulate", methods=["POST"])
+@read_only()
 @auth.login_required
 def simulate():
     request_data = request.get_json() 
-    schema = TransferSchema()
     try:
-        validated_data = schema.load(request_data)
+        validated_data = transfer_schema.load(request_data)
     except ValidationError as err:   
         if err.messages.get(400):
             response_data = err.messages[400]
@@ -80,13 +79,8 @@ def simulate():
         source_currency = validated_data["source_currency"]  
         target_currency = validated_data["target_currency"]
 
-        exchange_fees = ExchangeFee()
-        exchange_fee = exchange_fees.filter_by(
-                source_currency=source_currency,
-                target_currency=target_currency)
-
-        exchange_rates = ExchangeRate()
-        exchange_rate = exchange_rates.filter_by(
+        # Direct or triangulated quote of the pair
+        exchange_rate, exchange_fee = cross_rates.filter_by(
                 source_currency=source_currency,
                 target_currency=target_currency)
 
@@ -95,4 +89,50 @@ def simulate():
         
         response_data = {"msg": f"Amount in target currency: {recipient_amount}."}
         return jsonify(response_data), 201
-                                                                                 
+
+
+@bp.route("/simulate/batch", methods=["POST"])
+@read_only()
+@auth.login_required
+def simulate_batch():
+    try:
+        response_format = transfer_batch_query_schema.load(request.args)["format"]
+    except ValidationError as err:
+        response_data = err.messages[400]
+        return jsonify(response_data), 400
+    request_data = request.get_json()
+    # Refuse oversized batches before validating them
+    if isinstance(request_data, list) and len(request_data) > current_app.config["TRANSFER_BATCH_MAX_SIZE"]:
+        response_data = {"msg": f"At most {current_app.config['TRANSFER_BATCH_MAX_SIZE']} transfers are allowed per batch."}
+        return jsonify(response_data), 413
+    try:
+        validated_data = transfer_schema.load(request_data, many=True)
+    except ValidationError as err:
+        if err.messages.get(400):
+            response_data = err.messages[400]
+            return jsonify(response_data), 400
+        if err.messages.get(404):
+            response_data = err.messages[404]
+            return jsonify(response_data), 404
+    else:
+        if not validated_data:
+            response_data = {"msg": "At least one transfer is required."}
+            return jsonify(response_data), 400
+
+        # Quote each distinct pair once, then price every item with the single simulation formula
+        quotes = {}
+        for item in validated_data:
+            pair = (item["source_currency"], item["target_currency"])
+            if pair not in quotes:
+                quotes[pair] = cross_rates.filter_by(source_currency=pair[0], target_currency=pair[1])
+        for item in validated_data:
+            exchange_rate, exchange_fee = quotes[(item["source_currency"], item["target_currency"])]
+            item["recipient_amount"] = round(item["amount"] * (1 - exchange_fee) * exchange_rate, 2)
+
+        if response_format == "ndjson":
+            def generate():
+                for item in validated_data:
+                    yield current_app.json.dumps(item) + "\n"
+            return Response(stream_with_context(generate()), status=201, mimetype="application/x-ndjson")
+        response_data = {"data": validated_data}
+        return jsonify(response_data), 201
@@ -1,13 +1,15 @@
-                                    
 ### IMPORTS ####################################################################
 
 import jwt
+import time
 
 from flask import current_app, jsonify, url_for
 from flask_httpauth import HTTPTokenAuth
-from jwt.exceptions import InvalidSignatureError
+from jwt.exceptions import InvalidTokenError
 
+from app import db
 from app.models import User
+from app.utils.cache import app_cache
 
 
 ### HELPER: AUTHENTICATION #####################################################
@@ -16,14 +18,48 @@ from app.models import User
 auth = HTTPTokenAuth(scheme="Bearer")
 
 
+def _token_cache():
+    """Return the application's cache of verified token -> (user id, email)."""
+    return app_cache(
+            "auth_token",
+            maxsize=current_app.config["AUTH_TOKEN_CACHE_SIZE"],
+            ttl=current_app.config["AUTH_TOKEN_CACHE_TTL"])
+
+
+def invalidate_tokens(user=None):
+    """Forget the cached tokens of the user (e.g. after an update or unregistration)."""
+    _token_cache().discard_where(lambda identity: identity[0] == user.id)
+
+
+def login_rate_limited(email=None):
+    """Count a login attempt for the email and tell whether it exceeds LOGIN_RATE_LIMIT per LOGIN_RATE_LIMIT_PERIOD."""
+    config = current_app.config
+    if not config["LOGIN_RATE_LIMIT"]:
+        return False
+    attempts = app_cache(
+            "login_attempts",
+            maxsize=config["LOGIN_RATE_LIMIT_CACHE_SIZE"],
+            ttl=config["LOGIN_RATE_LIMIT_PERIOD"])
+    return attempts.incr(str(email).strip().lower()) > config["LOGIN_RATE_LIMIT"]
+
+
 @auth.verify_token
 def verify_token(token):
-    try:
-        payload = jwt.decode(token, key=current_app.config["SECRET_KEY"], algorithms=["HS256"])
-    except InvalidSignatureError:
-        return None
-    else:
-        return User.filter_users_by(email=payload["email"])
+    cache = _token_cache()
+    identity = cache.get(token)
+    if identity is None:
+        try:
+            payload = jwt.decode(token, key=current_app.config["SECRET_KEY"], algorithms=["HS256"])
+        except InvalidTokenError:
+            return None
+        identity = (payload.get("id"), payload["email"])
+        cache.set(token, identity, ttl=payload["exp"] - time.time())
+    user_id, email = identity
+    # Tokens issued before they carried the user id are looked up by email
+    user = db.session.get(User, user_id) if user_id else User.filter_users_by(email=email)
+    # Tokens stop working once the account email changes
+    if user and user.email == email:
+        return user
 
 
 @auth.error_handler
@@ -0,0 +1,79 @@
+import threading
+import time
+
+from collections import OrderedDict
+from flask import current_app
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after 'ttl' seconds."""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def discard_where(self, predicate):
+        """Remove the entries whose value satisfies 'predicate'."""
+        with self._lock:
+            for key in [key for key, (value, _) in self._data.items() if predicate(value)]:
+                del self._data[key]
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, expires_at = self._data[key]
+            except KeyError:
+                return default
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def incr(self, key, ttl=None):
+        """Increment the counter stored at 'key' and return its new value.
+
+        A new counter expires 'ttl' seconds after its first increment, which
+        makes it a fixed-window rate counter.
+        """
+        ttl = self._ttl if ttl is None else min(ttl, self._ttl)
+        now = time.monotonic()
+        with self._lock:
+            value, expires_at = self._data.get(key, (0, 0))
+            if expires_at <= now:
+                value, expires_at = 0, now + ttl
+            self._data[key] = (value + 1, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+            return value + 1
+
+    def set(self, key, value, ttl=None):
+        ttl = self._ttl if ttl is None else min(ttl, self._ttl)
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+
+def app_cache(name, maxsize=1024, ttl=300):
+    """Return the current application's cache called 'name', creating it on first use."""
+    caches = current_app.extensions.setdefault("caches", {})
+    cache = caches.get(name)
+    if cache is None:
+        cache = caches[name] = TTLCache(maxsize=maxsize, ttl=ttl)
+    return cache
@@ -1,49 +1,166 @@
 import csv
+import logging
+import os
+import threading
+import time
 
 
-class ExchangeRate:
-    
-    def __init__(self):
-        self._exchange_rates = []
+# Directory holding the currency CSV files
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
 
-        with open("app/data/exchange_rates.csv") as file:
+# Child of the application's logger ('app')
+logger = logging.getLogger(__name__)
+
+
+class CurrencyTable:
+    """Process-wide table of currency pairs loaded from a CSV file.
+
+    The file is parsed once and kept in memory as a dict keyed by
+    '(source_currency, target_currency)'. Its modification time is checked at
+    most every 'check_interval' seconds, and a newer file is reloaded and
+    swapped in atomically, so rate updates don't need a restart. A newer file
+    that can't be read or parsed is logged and the previous table kept.
+    """
+
+    filename = None
+    value_field = None
+
+    def __init__(self, path=None, check_interval=1.0):
+        self._path = path or os.path.join(DATA_DIR, self.filename)
+        self._check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        self._table = {}
+        self.reload()
+
+    def _load(self):
+        table = {}
+        with open(self._path) as file:
             reader = csv.DictReader(file)
             for row in reader:
-                exchange_rate = {}
-                exchange_rate["source_currency"] = row["currency_from"]
-                exchange_rate["target_currency"] = row["currency_to"]
-                exchange_rate["exchange_rate"] = float(row["rate"])
-                self._exchange_rates.append(exchange_rate)
-                                                       
-    @property
-    def source_currencies(self):
-        return list({exchange_rate["source_currency"] for exchange_rate in self._exchange_rates}) 
+                table[(row["currency_from"], row["currency_to"])] = float(row[self.value_field])
+        return table
+
+    def _refresh(self):
+        """Reload the table if the underlying file has changed."""
+        now = time.monotonic()
+        if now - self._checked_at < self._check_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self._path).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._mtime:
+            try:
+                self.reload()
+            except (OSError, csv.Error, KeyError, TypeError, ValueError) as err:
+                # Not retried until the file changes again
+                self._mtime = mtime
+                logger.error("Reloading %s failed, keeping the previous table: %r", self._path, err)
+
+    def reload(self):
+        with self._lock:
+            mtime = os.stat(self._path).st_mtime_ns
+            # Swapped in a single assignment, once fully parsed
+            self._table = self._load()
+            self._mtime = mtime
+            self._checked_at = time.monotonic()
 
     @property
-    def target_currencies(self):
-        return list({exchange_rate["target_currency"] for exchange_rate in self._exchange_rates})  
+    def table(self):
+        """Current '(source_currency, target_currency) -> value' dict (replaced, never mutated, on reload)."""
+        self._refresh()
+        return self._table
 
     def filter_by(self, source_currency=None, target_currency=None):
-        for exchange_rate in self._exchange_rates:
-            if (exchange_rate["source_currency"], exchange_rate["target_currency"]) == (source_currency, target_currency):
-                return exchange_rate["exchange_rate"]  
+        self._refresh()
+        return self._table.get((source_currency, target_currency))
 
 
-class ExchangeFee:
-    
-    def __init__(self):
-        self._exchange_fees = []
+class ExchangeRate(CurrencyTable):
+    filename = "exchange_rates.csv"
+    value_field = "rate"
 
-        with open("app/data/exchange_fees.csv") as file:
-            reader = csv.DictReader(file)
-            for row in reader:  
-                exchange_fee = {}
-                exchange_fee["source_currency"] = row["currency_from"]
-                exchange_fee["target_currency"] = row["currency_to"]
-                exchange_fee["exchange_fee"] = float(row["fee"])
-                self._exchange_fees.append(exchange_fee) 
+
+class ExchangeFee(CurrencyTable):
+    filename = "exchange_fees.csv"
+    value_field = "fee"
+
+
+class CrossRates:
+    """Exchange rate and fee between any two currencies of the rate table.
+
+    Listed pairs are quoted as they are. The others are triangulated through
+    the chain of listed pairs that delivers the largest share of the amount,
+    i.e. the highest product of 'rate * (1 - fee)', found for all the pairs at
+    once (Floyd-Warshall over a dense currency-index matrix). The matrix is
+    rebuilt only when either file has been reloaded.
+    """
+
+    def __init__(self, rates, fees):
+        self._rates = rates
+        self._fees = fees
+        self._lock = threading.Lock()
+        self._tables = (None, None)
+        self._snapshot = ({}, [], frozenset())
+
+    @staticmethod
+    def _build(rates, fees):
+        currencies = sorted({currency for pair in rates for currency in pair})
+        index = {currency: i for i, currency in enumerate(currencies)}
+        n = len(currencies)
+        # Share of the amount delivered, with the rate and fee it is made of
+        delivered = [[0.0] * n for _ in range(n)]
+        quotes = [[None] * n for _ in range(n)]
+        for (source, target), rate in rates.items():
+            fee = fees.get((source, target), 0.0)
+            i, j = index[source], index[target]
+            delivered[i][j] = rate * (1 - fee)
+            quotes[i][j] = (rate, fee)
+        for k in range(n):
+            for i in range(n):
+                if not delivered[i][k]:
+                    continue
+                for j in range(n):
+                    candidate = delivered[i][k] * delivered[k][j]
+                    if candidate > delivered[i][j]:
+                        delivered[i][j] = candidate
+                        (rate_ik, fee_ik), (rate_kj, fee_kj) = quotes[i][k], quotes[k][j]
+                        quotes[i][j] = (rate_ik * rate_kj, 1 - (1 - fee_ik) * (1 - fee_kj))
+        # Listed pairs keep their own quote, and a currency converts to itself for free
+        for (source, target), rate in rates.items():
+            quotes[index[source]][index[target]] = (rate, fees.get((source, target), 0.0))
+        for i in range(n):
+            quotes[i][i] = (1.0, 0.0)
+        return index, quotes, frozenset(currencies)
+
+    def _refresh(self):
+        tables = (self._rates.table, self._fees.table)
+        if tables[0] is self._tables[0] and tables[1] is self._tables[1]:
+            return
+        with self._lock:
+            if tables[0] is not self._tables[0] or tables[1] is not self._tables[1]:
+                self._snapshot = self._build(*tables)
+                self._tables = tables
+
+    @property
+    def currencies(self):
+        self._refresh()
+        return self._snapshot[2]
 
     def filter_by(self, source_currency=None, target_currency=None):
-        for exchange_fee in self._exchange_fees:
-            if (exchange_fee["source_currency"], exchange_fee["target_currency"]) == (source_currency, target_currency):
-                return exchange_fee["exchange_fee"]                                                                    
+        """Return the '(rate, fee)' quote of the pair, or None if it can't be converted."""
+        self._refresh()
+        index, quotes, _ = self._snapshot
+        i, j = index.get(source_currency), index.get(target_currency)
+        if i is None or j is None:
+            return None
+        return quotes[i][j]
+
+
+# Shared across requests
+exchange_rates = ExchangeRate()
+exchange_fees = ExchangeFee()
+cross_rates = CrossRates(exchange_rates, exchange_fees)
@@ -0,0 +1,354 @@
+### IMPORTS ####################################################################
+
+import bisect
+import math
+
+from collections import namedtuple
+from datetime import timedelta
+
+from app import db
+from app.models import SpendingBucket, SpendingStatistics, Transaction, TransactionArchive
+from app.utils.money import cents, to_cents
+
+
+### AGGREGATES #################################################################
+
+class Statistics(namedtuple("Statistics", ("count", "total", "sum_squares"))):
+    """Count, sum and sum of squares of amounts, in floating-point units."""
+
+    @classmethod
+    def from_cents(cls, count, total, sum_squares):
+        return cls(count, total / 100, sum_squares / 10000)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    @property
+    def stdev(self):
+        """Sample standard deviation (0 for fewer than two values)."""
+        if self.count < 2:
+            return 0
+        variance = (self.sum_squares - self.total * self.total / self.count) / (self.count - 1)
+        return math.sqrt(variance) if variance > 0 else 0
+
+
+class Aggregate:
+    """Value over the user's history that one or more fraud rules depend on.
+
+    Aggregates compare equal when they describe the same value, so the engine
+    computes each of them once however many rules declare it.
+    """
+
+    @property
+    def key(self):
+        return (type(self),)
+
+    def __eq__(self, other):
+        return isinstance(other, Aggregate) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def queries(self, transaction):
+        """Return the single-row SELECT statements the aggregate is computed from."""
+        raise NotImplementedError
+
+    def result(self, values):
+        """Build the aggregate from the values returned by its queries."""
+        raise NotImplementedError
+
+    def sweep(self, transactions, history, lifetime):
+        """Compute the aggregate for each transaction of a batch sorted by timestamp.
+
+        'history' holds the '(timestamp, amount, category)' tuples of the user's
+        stored transactions covering the batch windows, sorted by timestamp, and
+        'lifetime' the user's running statistics before the batch. Each
+        transaction sees the stored history plus the transactions before it.
+        """
+        raise NotImplementedError
+
+
+# Archived transactions are read in the same statements as the hot ones,
+# through the same '(user_id, timestamp)' indexes: ranges newer than the
+# user's archived transactions end their index seek at once
+HISTORY_MODELS = (Transaction, TransactionArchive)
+
+
+class Window(Aggregate):
+    """Statistics of the user's transactions in [timestamp - period, timestamp)."""
+
+    def __init__(self, period):
+        self.period = period
+
+    @property
+    def key(self):
+        return (type(self), self.period)
+
+    @staticmethod
+    def _transaction_queries(transaction, ranges):
+        queries = []
+        for model in HISTORY_MODELS:
+            conditions = [db.and_(model.timestamp >= start, model.timestamp < end) for start, end in ranges]
+            amount = cents(model.amount)
+            queries.append(db.select(
+                    db.func.count(model.id),
+                    db.func.coalesce(db.func.sum(amount), 0),
+                    db.func.coalesce(db.func.sum(db.cast(amount, db.Float) * amount), 0.0)
+                    ).filter(model.user_id == transaction.user_id, db.or_(*conditions)))
+        return queries
+
+    @staticmethod
+    def _bucket_query(transaction, min_day, max_day):
+        return db.select(
+                db.func.coalesce(db.func.sum(SpendingBucket.count), 0),
+                db.func.coalesce(db.func.sum(cents(SpendingBucket.total)), 0),
+                db.func.coalesce(db.func.sum(SpendingBucket.sum_squares), 0.0)
+                ).filter(
+                    SpendingBucket.user_id == transaction.user_id,
+                    SpendingBucket.day >= min_day,
+                    SpendingBucket.day < max_day)
+
+    def queries(self, transaction):
+        max_date = transaction.timestamp
+        min_date = max_date - self.period
+        if self.period < timedelta(days=2):
+            return self._transaction_queries(transaction, ((min_date, max_date),))
+        # Whole days inside the window are read from the daily buckets, and
+        # only the two partial days at its edges from the transactions table
+        first_day = SpendingBucket.day_of(min_date) + timedelta(days=1)
+        last_day = SpendingBucket.day_of(max_date)
+        return [
+            self._bucket_query(transaction, first_day, last_day),
+            *self._transaction_queries(transaction, ((min_date, first_day), (last_day, max_date)))]
+
+    def result(self, values):
+        # Add up the bucket and edge statistics column by column
+        return Statistics.from_cents(*(sum(values[i::3]) for i in range(3)))
+
+    def sweep(self, transactions, history, lifetime):
+        events = _merge(transactions, history)
+        results = []
+        count, total, sum_squares = 0, 0.0, 0.0
+        start = end = 0
+        for transaction in transactions:
+            # Slide both ends of the window over the merged events
+            while end < len(events) and events[end][0] < transaction.timestamp:
+                amount = float(events[end][1])
+                count, total, sum_squares = count + 1, total + amount, sum_squares + amount * amount
+                end += 1
+            min_date = transaction.timestamp - self.period
+            while start < end and events[start][0] < min_date:
+                amount = float(events[start][1])
+                count, total, sum_squares = count - 1, total - amount, sum_squares - amount * amount
+                start += 1
+            results.append(Statistics(count, total, sum_squares))
+        return results
+
+
+class CategoryWindow(Aggregate):
+    """Whether the user has transactions in the same category in [timestamp - period, timestamp)."""
+
+    def __init__(self, period):
+        self.period = period
+
+    @property
+    def key(self):
+        return (type(self), self.period)
+
+    def queries(self, transaction):
+        max_date = transaction.timestamp
+        min_date = max_date - self.period
+        return [db.select(db.exists().where(
+                model.user_id == transaction.user_id,
+                model.category == transaction.category,
+                model.timestamp >= min_date,
+                model.timestamp < max_date)) for model in HISTORY_MODELS]
+
+    def result(self, values):
+        return any(values)
+
+    def sweep(self, transactions, history, lifetime):
+        timestamps = {}
+        for timestamp, _, category in _merge(transactions, history):
+            timestamps.setdefault(category, []).append(timestamp)
+        results = []
+        for transaction in transactions:
+            category_timestamps = timestamps[transaction.category]
+            i = bisect.bisect_left(category_timestamps, transaction.timestamp - self.period)
+            results.append(i < len(category_timestamps) and category_timestamps[i] < transaction.timestamp)
+        return results
+
+
+class Lifetime(Aggregate):
+    """Running statistics of all the user's transactions."""
+
+    def queries(self, transaction):
+        return [db.select(
+                db.func.coalesce(db.func.max(SpendingStatistics.count), 0),
+                db.func.coalesce(db.func.max(cents(SpendingStatistics.total)), 0),
+                db.func.coalesce(db.func.max(SpendingStatistics.sum_squares), 0.0)
+                ).filter(SpendingStatistics.user_id == transaction.user_id)]
+
+    def result(self, values):
+        return Statistics.from_cents(*values)
+
+    def sweep(self, transactions, history, lifetime):
+        results = []
+        count, total, sum_squares = lifetime
+        for transaction in transactions:
+            # Each transaction counts itself, as it does once stored
+            amount = float(transaction.amount)
+            count, total, sum_squares = count + 1, total + amount, sum_squares + amount * amount
+            results.append(Statistics(count, total, sum_squares))
+        return results
+
+
+def _merge(transactions, history):
+    """Merge the batch into the stored history as '(timestamp, amount, category)' tuples sorted by timestamp."""
+    events = list(history)
+    events.extend((transaction.timestamp, transaction.amount, transaction.category) for transaction in transactions)
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+### ENGINE #####################################################################
+
+class FraudRule:
+    """Base class of the fraud detection rules.
+
+    Subclasses declare the aggregates they need in 'aggregates' and read them
+    from the shared context passed to 'check'.
+    """
+
+    id = None
+    aggregates = ()
+
+    def __repr__(self):
+        return f"{type(self).__name__}(id='{self.id}')"
+
+    def check(self, transaction, context):
+        raise NotImplementedError
+
+
+class FraudEngine:
+
+    def __init__(self):
+        self._rules = []
+
+    @property
+    def rules(self):
+        return list(self._rules)
+
+    @property
+    def aggregates(self):
+        aggregates = {}
+        for rule in self._rules:
+            for aggregate in rule.aggregates:
+                aggregates.setdefault(aggregate, aggregate)
+        return list(aggregates)
+
+    def register(self, rule_class):
+        """Register a rule class (usable as a class decorator)."""
+        self._rules.append(rule_class())
+        return rule_class
+
+    def _context(self, transaction):
+        """Compute every aggregate required by the rules in a single query."""
+        aggregates = self.aggregates
+        if not aggregates:
+            return {}
+        subqueries = []
+        spans = []
+        for aggregate in aggregates:
+            queries = aggregate.queries(transaction)
+            spans.append((aggregate, sum(len(query.selected_columns) for query in queries)))
+            subqueries.extend(query.subquery() for query in queries)
+        # Every subquery returns one row, so they are cross-joined into one
+        stmt = db.select(*[column for subquery in subqueries for column in subquery.c])
+        stmt = stmt.select_from(subqueries[0])
+        for subquery in subqueries[1:]:
+            stmt = stmt.join(subquery, db.true())
+        row = db.session.execute(stmt).one()
+        context = {}
+        position = 0
+        for aggregate, width in spans:
+            context[aggregate] = aggregate.result(row[position:position + width])
+            position += width
+        return context
+
+    def evaluate(self, transaction):
+        """Return the ids of the rules the transaction complies with."""
+        context = self._context(transaction)
+        return [rule.id for rule in self._rules if rule.check(transaction, context)]
+
+    def evaluate_batch(self, user, transactions):
+        """Return the ids of the rules each transaction complies with, as if they were added one by one.
+
+        The transactions must be sorted by timestamp and not stored yet. The
+        user's history is read with one query and every aggregate is computed
+        for the whole batch in a single sweep.
+        """
+        if not transactions:
+            return []
+        aggregates = self.aggregates
+        period = max((getattr(aggregate, "period", timedelta(0)) for aggregate in aggregates), default=timedelta(0))
+        min_date = transactions[0].timestamp - period
+        stmt = db.union_all(*(
+                db.select(model.timestamp, model.amount, model.category).filter(
+                    model.user_id == user.id,
+                    model.timestamp >= min_date,
+                    model.timestamp < transactions[-1].timestamp)
+                for model in HISTORY_MODELS)).order_by("timestamp")
+        history = [tuple(row) for row in db.session.execute(stmt)]
+        lifetime = db.session.get(SpendingStatistics, user.id)
+        lifetime = Statistics.from_cents(lifetime.count, to_cents(lifetime.total), lifetime.sum_squares) if lifetime else Statistics(0, 0.0, 0.0)
+        results = {aggregate: aggregate.sweep(transactions, history, lifetime) for aggregate in aggregates}
+        fired = []
+        for i, transaction in enumerate(transactions):
+            context = {aggregate: results[aggregate][i] for aggregate in aggregates}
+            fired.append([rule.id for rule in self._rules if rule.check(transaction, context)])
+        return fired
+
+
+fraud_engine = FraudEngine()
+
+
+### RULES ######################################################################
+
+@fraud_engine.register
+class DeviationRule(FraudRule):
+    """Fraud Detection Rule 1: amount above three standard deviations of the last 90 days."""
+
+    id = 1
+    window = Window(timedelta(days=90))
+    aggregates = (window,)
+
+    def check(self, transaction, context):
+        return transaction.amount > 3 * context[self.window].stdev
+
+
+@fraud_engine.register
+class NewCategoryRule(FraudRule):
+    """Fraud Detection Rule 2: no transaction in the same category in the last 180 days."""
+
+    id = 2
+    window = CategoryWindow(timedelta(days=180))
+    aggregates = (window,)
+
+    def check(self, transaction, context):
+        return not context[self.window]
+
+
+@fraud_engine.register
+class BurstRule(FraudRule):
+    """Fraud Detection Rule 3: more than three transactions in the last 5 minutes adding up to more than the average spending."""
+
+    id = 3
+    window = Window(timedelta(minutes=5))
+    lifetime = Lifetime()
+    aggregates = (window, lifetime)
+
+    def check(self, transaction, context):
+        recent = context[self.window]
+        return recent.count > 3 and recent.total > context[self.lifetime].mean
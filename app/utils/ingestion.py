@@ -0,0 +1,82 @@
+### IMPORTS ####################################################################
+
+from datetime import datetime
+
+from app import db
+from app.models import Transaction
+from app.utils.fraud import fraud_engine
+from app.utils.metrics import span
+
+
+### HELPER: TRANSACTION INGESTION ##############################################
+
+def ingest_transaction(user, transaction, score=True):
+    """Score, store and charge a transaction in a single database transaction.
+
+    With 'score=False' the transaction is stored and charged straight away and
+    queued for 'score_pending_transactions' instead.
+    """
+    # Charged first: the user's row lock then orders concurrent writers of the
+    # user before the insert takes its shared foreign key lock on that row
+    # (without flushing the transaction, which isn't in the session yet)
+    with db.session.no_autoflush:
+        user.debit(amount=transaction.amount)
+    transaction.scored = score
+    transaction.add(commit=False)
+    db.session.flush()
+
+    # Mark the transaction as fraud if it complies with at least one of the fraud detection rules
+    if score:
+        with span("fraud_evaluate"):
+            transaction.fraud = bool(fraud_engine.evaluate(transaction))
+
+    # Notify the user if the user's balance drops by more that chosen threshold
+    if score:
+        user.notify(balance_drop=transaction.amount)
+    db.session.commit()
+    return transaction
+
+
+def ingest_transactions(user, transactions):
+    """Score, store and charge a batch of the user's transactions in a single database transaction.
+
+    The transactions are scored as if they had been added one by one in
+    timestamp order, charged to the user's balance as a single net change and
+    inserted with bulk INSERTs.
+    """
+    for transaction in transactions:
+        if transaction.timestamp is None:
+            transaction.timestamp = datetime.utcnow()
+    transactions = sorted(transactions, key=lambda transaction: transaction.timestamp)
+
+    # Charged first, as in 'ingest_transaction', so the user's row is locked before the insert
+    balance_drop = sum(transaction.amount for transaction in transactions)
+    user.debit(amount=balance_drop)
+
+    # Mark the transactions that comply with at least one of the fraud detection rules
+    with span("fraud_evaluate_batch"):
+        fired = fraud_engine.evaluate_batch(user, transactions)
+    for transaction, fraud_rules in zip(transactions, fired):
+        transaction.fraud = bool(fraud_rules)
+        transaction.scored = True
+    Transaction.add_all(user=user, transactions=transactions)
+
+    # Notify the user if the user's balance drops by more that chosen threshold
+    user.notify(balance_drop=balance_drop)
+    db.session.commit()
+    return transactions
+
+
+def score_pending_transactions(batch_size=100):
+    """Score a batch of the transactions queued by 'ingest_transaction' and notify their users.
+
+    Returns the number of transactions scored.
+    """
+    transactions = Transaction.filter_pending(limit=batch_size)
+    for transaction in transactions:
+        if fraud_engine.evaluate(transaction):
+            transaction.fraud = True
+        transaction.scored = True
+        transaction.user.notify(balance_drop=transaction.amount)
+    db.session.commit()
+    return len(transactions)
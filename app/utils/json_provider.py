@@ -0,0 +1,56 @@
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, with amounts of money written as JSON numbers rather than strings."""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, Decimal):
+            return float(o)
+        return DefaultJSONProvider.default(o)
+
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson, writing the same documents as 'JSONProvider'."""
+
+    def _options(self, indent=None):
+        # Dates are left to 'default' to keep Flask's HTTP date format
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._options(kwargs.get("indent"))).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        # Bytes straight into the response body, without a round trip through 'str'
+        data = orjson.dumps(obj, default=self.default, option=self._options(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(data, mimetype=self.mimetype)
+
+
+JSON_PROVIDERS = {"json": JSONProvider, "orjson": OrjsonProvider}
+
+
+def create_json_provider(app):
+    """Return the JSON provider selected by the JSON_BACKEND setting."""
+    backend = app.config["JSON_BACKEND"]
+    if backend not in JSON_PROVIDERS:
+        raise RuntimeError(f"Unknown JSON_BACKEND '{backend}' (expected one of: {', '.join(JSON_PROVIDERS)}).")
+    if backend == "orjson" and orjson is None:
+        raise RuntimeError("JSON_BACKEND 'orjson' requires the orjson package (pip install orjson).")
+    return JSON_PROVIDERS[backend](app)
@@ -0,0 +1,31 @@
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class LazyLoadError(RuntimeError):
+    """A relationship was loaded lazily where the code should have loaded it explicitly."""
+
+
+def _check_lazy_load(orm_execute_state):
+    if not orm_execute_state.is_select or orm_execute_state.lazy_loaded_from is None or not has_app_context():
+        return
+    mode = current_app.config["SQLALCHEMY_LAZY_LOAD_GUARD"]
+    if not mode:
+        return
+    path = orm_execute_state.loader_strategy_path
+    message = f"Unplanned lazy load of {path[-1] if path else 'a relationship'} from {orm_execute_state.lazy_loaded_from.obj()!r}."
+    if mode == "raise":
+        raise LazyLoadError(message)
+    current_app.logger.warning(message)
+
+
+def init_lazy_load_guard(app):
+    """Report the lazy relationship loads according to SQLALCHEMY_LAZY_LOAD_GUARD ('warn' or 'raise').
+
+    Testing applications raise unless the setting says otherwise.
+    """
+    if app.config["SQLALCHEMY_LAZY_LOAD_GUARD"] is None and app.testing:
+        app.config["SQLALCHEMY_LAZY_LOAD_GUARD"] = "raise"
+    if not event.contains(Session, "do_orm_execute", _check_lazy_load):
+        event.listen(Session, "do_orm_execute", _check_lazy_load)
@@ -0,0 +1,264 @@
+import collections
+import os
+import sys
+import threading
+import time
+
+from contextlib import contextmanager
+from datetime import datetime
+from flask import current_app, g, has_app_context, has_request_context, request, Response
+from sqlalchemy import event
+
+from app import db
+
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+### METRICS ####################################################################
+
+class Metric:
+    """Thread-safe metric rendered in the Prometheus text format."""
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _labels(self, labelvalues, extra=()):
+        pairs = list(zip(self.labelnames, labelvalues)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            series = {labelvalues: self._copy(value) for labelvalues, value in self._series.items()}
+        for labelvalues, value in sorted(series.items()):
+            lines.extend(self._render_series(labelvalues, value))
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._series[labelvalues] = self._series.get(labelvalues, 0) + amount
+
+    def _copy(self, value):
+        return value
+
+    def _render_series(self, labelvalues, value):
+        return [f"{self.name}_total{self._labels(labelvalues)} {value}"]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labelvalues):
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                # Bucket counts, then sum and count
+                series = self._series[labelvalues] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def _copy(self, value):
+        return list(value)
+
+    def _render_series(self, labelvalues, value):
+        lines = [f"{self.name}_bucket{self._labels(labelvalues, [('le', _format(bound))])} {count}"
+                 for bound, count in zip(self.buckets, value)]
+        lines.append(f"{self.name}_bucket{self._labels(labelvalues, [('le', '+Inf')])} {value[-1]}")
+        lines.append(f"{self.name}_sum{self._labels(labelvalues)} {value[-2]}")
+        lines.append(f"{self.name}_count{self._labels(labelvalues)} {value[-1]}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format(value):
+    return repr(float(value))
+
+
+class Metrics:
+    """Metrics of an application, exposed on '/metrics'."""
+
+    def __init__(self):
+        self.request_duration = Histogram(
+                "http_request_duration_seconds", "Request latency.", ("endpoint", "method", "status"))
+        self.queries = Histogram(
+                "db_queries_per_request", "SQL statements executed per request.", ("endpoint",),
+                buckets=QUERY_COUNT_BUCKETS)
+        self.query_duration = Histogram(
+                "db_query_duration_seconds", "Latency of the SQL statements.", ("endpoint",))
+        self.n_plus_one = Counter(
+                "db_n_plus_one", "Requests repeating the same SELECT statement at least METRICS_N_PLUS_ONE_THRESHOLD times.",
+                ("endpoint",))
+        self.spans = Histogram(
+                "span_duration_seconds", "Latency of the instrumented code blocks.", ("span",))
+
+    def render(self):
+        lines = []
+        for metric in (self.request_duration, self.queries, self.query_duration, self.n_plus_one, self.spans):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def span(name):
+    """Record the duration of the enclosed block when the metrics are enabled."""
+    metrics = current_app.extensions.get("metrics") if has_app_context() else None
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.spans.observe(time.perf_counter() - started, name)
+
+
+### PROFILER ###################################################################
+
+class Sampler:
+    """Sampling profiler of the threads serving requests.
+
+    A single daemon thread reads the stacks of the registered threads every
+    'interval' seconds and counts them in the collapsed format used by flame
+    graph tools ('outer;inner count').
+    """
+
+    def __init__(self, interval):
+        self._interval = interval
+        self._stacks = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, ident):
+        with self._lock:
+            self._stacks[ident] = collections.Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-sampler", daemon=True)
+                self._thread.start()
+
+    def stop(self, ident):
+        with self._lock:
+            return self._stacks.pop(ident, collections.Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self._interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, stacks in self._stacks.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        stacks[_collapse(frame)] += 1
+
+
+def _collapse(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+def _dump_profile(stacks, endpoint, duration):
+    directory = current_app.config["PROFILER_DIR"] or os.path.join(current_app.instance_path, "profiles")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{endpoint}.folded")
+    with open(path, "w") as file:
+        for stack, count in stacks.most_common():
+            file.write(f"{stack} {count}\n")
+    current_app.logger.info("Slow request to %s (%.0f ms) profiled in %s", endpoint, duration * 1000, path)
+
+
+### HOOKS ######################################################################
+
+def init_metrics(app):
+    """Instrument the application according to METRICS_ENABLED and PROFILER_SLOW_REQUEST_MS."""
+    metrics = Metrics() if app.config["METRICS_ENABLED"] else None
+    slow_request_ms = app.config["PROFILER_SLOW_REQUEST_MS"]
+    sampler = Sampler(app.config["PROFILER_INTERVAL_MS"] / 1000) if slow_request_ms else None
+    if metrics is None and sampler is None:
+        return
+    n_plus_one_threshold = app.config["METRICS_N_PLUS_ONE_THRESHOLD"]
+
+    if metrics is not None:
+        app.extensions["metrics"] = metrics
+        app.add_url_rule("/metrics", "metrics", lambda: Response(metrics.render(), mimetype="text/plain; version=0.0.4"))
+
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    @app.before_request
+    def start_request():
+        g.metrics_started = time.perf_counter()
+        g.metrics_status = 500
+        g.metrics_queries = collections.Counter()
+        if sampler is not None:
+            sampler.start(threading.get_ident())
+
+    @app.after_request
+    def record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    # Recorded on teardown so that streamed responses are measured to the end
+    @app.teardown_request
+    def finish_request(exc):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+        endpoint = request.endpoint or "unmatched"
+        if sampler is not None:
+            stacks = sampler.stop(threading.get_ident())
+            if duration * 1000 >= slow_request_ms and stacks:
+                _dump_profile(stacks, endpoint, duration)
+        if metrics is None:
+            return
+        queries = g.metrics_queries
+        metrics.request_duration.observe(duration, endpoint, request.method, g.metrics_status)
+        metrics.queries.observe(sum(queries.values()), endpoint)
+        repeated = [(statement, count) for statement, count in queries.items()
+                    if count >= n_plus_one_threshold and statement.lstrip().upper().startswith("SELECT")]
+        if repeated:
+            metrics.n_plus_one.inc(endpoint)
+            for statement, count in repeated:
+                current_app.logger.warning("Possible N+1 query in %s: %d executions of %s", endpoint, count, statement)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context.metrics_started
+    if not has_request_context() or "metrics_queries" not in g:
+        return
+    g.metrics_queries[statement] += 1
+    current_app.extensions["metrics"].query_duration.observe(duration, request.endpoint or "unmatched")
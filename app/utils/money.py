@@ -0,0 +1,44 @@
+from decimal import Decimal, ROUND_HALF_EVEN
+from sqlalchemy import BigInteger, type_coerce
+from sqlalchemy.types import TypeDecorator
+
+
+CENT = Decimal("0.01")
+ZERO = Decimal("0.00")
+
+
+def to_decimal(value):
+    """Round an amount to a Decimal of whole cents (floats through their shortest repr)."""
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return value.quantize(CENT, rounding=ROUND_HALF_EVEN)
+
+
+def to_cents(value):
+    return int(to_decimal(value).scaleb(2))
+
+
+def from_cents(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+class Money(TypeDecorator):
+    """Amount of money stored as an integer number of cents and loaded as a Decimal."""
+
+    impl = BigInteger
+    cache_ok = True
+
+    @property
+    def python_type(self):
+        return Decimal
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else to_cents(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else from_cents(value)
+
+
+def cents(column):
+    """Select an amount of money as its stored integer cents rather than a Decimal."""
+    return type_coerce(column, BigInteger)
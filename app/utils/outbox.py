@@ -0,0 +1,43 @@
+### IMPORTS ####################################################################
+
+from flask import current_app
+
+from app import db, mail
+from app.models import Notification
+
+
+### HELPER: EMAIL OUTBOX #######################################################
+
+def dispatch_notifications(batch_size=None):
+    """Send a batch of pending notifications over a single SMTP connection.
+
+    Notifications that can't be sent are retried with exponential backoff and
+    marked as failed after 'MAIL_OUTBOX_MAX_ATTEMPTS' attempts. Returns the
+    number of notifications processed.
+    """
+    config = current_app.config
+    notifications = Notification.filter_pending(limit=batch_size or config["MAIL_OUTBOX_BATCH_SIZE"])
+    if not notifications:
+        db.session.commit()
+        return 0
+    retry = {
+        "max_attempts": config["MAIL_OUTBOX_MAX_ATTEMPTS"],
+        "retry_delay": config["MAIL_OUTBOX_RETRY_DELAY"]}
+    processed = set()
+    try:
+        with mail.connect() as connection:
+            for notification in notifications:
+                try:
+                    connection.send(notification.generate_message())
+                except Exception as err:
+                    notification.mark_failed(error=repr(err), **retry)
+                else:
+                    notification.mark_sent()
+                processed.add(notification.id)
+    except Exception as err:
+        # The SMTP connection failed: retry the rest of the batch later
+        for notification in notifications:
+            if notification.id not in processed:
+                notification.mark_failed(error=repr(err), **retry)
+    db.session.commit()
+    return len(notifications)
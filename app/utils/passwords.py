@@ -0,0 +1,89 @@
+import bcrypt
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app
+
+
+### HASHING ####################################################################
+
+# Executed in the pool processes
+def _hashpw(password, rounds, prefix):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds, prefix=prefix))
+
+
+def _checkpw(password, hashed_password):
+    return hmac.compare_digest(bcrypt.hashpw(password, hashed_password), hashed_password)
+
+
+class HashingPool:
+    """Process pool running the bcrypt work off the request threads.
+
+    The pool is created on first use in each process (so gunicorn workers
+    don't share a pool forked from the master) and bounds the number of
+    hashes computed at once to its size. A size of 0 hashes on the calling
+    thread.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self, size):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # Spawned rather than forked: the workers serve requests from several threads
+                self._executor = ProcessPoolExecutor(max_workers=size, mp_context=multiprocessing.get_context("spawn"))
+                self._pid = os.getpid()
+            return self._executor
+
+    def run(self, function, *args):
+        size = current_app.config["BCRYPT_POOL_SIZE"]
+        if not size:
+            return function(*args)
+        return self._get_executor(size).submit(function, *args).result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+hashing_pool = HashingPool()
+
+
+def _to_bytes(password):
+    password = password.encode("utf-8") if isinstance(password, str) else password
+    # Same pre-hashing as Flask-Bcrypt for passwords longer than bcrypt's 72 bytes
+    if current_app.config["BCRYPT_HANDLE_LONG_PASSWORDS"]:
+        password = hashlib.sha256(password).hexdigest().encode("utf-8")
+    return password
+
+
+def hash_password(password):
+    """Return the bcrypt hash of the password at the BCRYPT_LOG_ROUNDS cost."""
+    config = current_app.config
+    hashed_password = hashing_pool.run(
+            _hashpw, _to_bytes(password), config["BCRYPT_LOG_ROUNDS"], config["BCRYPT_HASH_PREFIX"].encode("utf-8"))
+    return hashed_password.decode("utf-8")
+
+
+def check_password(hashed_password, password):
+    """Check the password against its bcrypt hash in constant time."""
+    return hashing_pool.run(_checkpw, _to_bytes(password), hashed_password.encode("utf-8"))
+
+
+def password_needs_rehash(hashed_password):
+    """Whether the hash was computed at a cost other than BCRYPT_LOG_ROUNDS."""
+    # Hashes read '$<prefix>$<rounds>$<salt and checksum>'
+    try:
+        rounds = int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    return rounds != current_app.config["BCRYPT_LOG_ROUNDS"]
@@ -0,0 +1,113 @@
+import random
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, Select
+
+from app.utils.cache import app_cache
+
+
+REPLICA_BIND_PREFIX = "replica_"
+
+
+### ROUTING SESSION ############################################################
+
+class RoutingSession(Session):
+    """Session sending the SELECTs of read-only views to a replica and everything else to the primary.
+
+    A request is served by the replica picked when it starts, until it
+    writes: from then on (and for SQLALCHEMY_REPLICA_STICKY_SECONDS after
+    it, see 'init_replicas') its reads go to the primary as well.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _replica_allowed(clause):
+            return g.db_replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _replica_allowed(clause):
+    return (has_request_context()
+            and g.get("db_replica") is not None
+            and not g.get("db_wrote")
+            and isinstance(clause, Select)
+            and clause._for_update_arg is None)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _after_flush(session, flush_context):
+    if has_request_context():
+        g.db_wrote = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _on_bulk_write(orm_execute_state):
+    # Bulk INSERT/UPDATE/DELETE statements bypass the flush
+    if not orm_execute_state.is_select and has_request_context():
+        g.db_wrote = True
+
+
+### VIEWS ######################################################################
+
+def read_only(*methods):
+    """Mark a view (or only its given HTTP methods) as read-only: its queries may run on a replica."""
+    def decorator(view):
+        view.read_only_methods = methods or None
+        return view
+    return decorator
+
+
+def _is_read_only(view):
+    if not hasattr(view, "read_only_methods"):
+        return False
+    return view.read_only_methods is None or request.method in view.read_only_methods
+
+
+### SETUP ######################################################################
+
+def configure_replica_binds(app):
+    """Add an engine bind per SQLALCHEMY_REPLICA_URIS entry (before 'db.init_app')."""
+    binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+    for i, uri in enumerate(app.config["SQLALCHEMY_REPLICA_URIS"]):
+        binds[f"{REPLICA_BIND_PREFIX}{i}"] = uri
+    app.config["SQLALCHEMY_BINDS"] = binds
+
+
+def init_replicas(app, db):
+    """Route the read-only views to the replicas, with read-your-writes stickiness."""
+    if not app.config["SQLALCHEMY_REPLICA_URIS"]:
+        return
+
+    # Clients that wrote in the last SQLALCHEMY_REPLICA_STICKY_SECONDS read from the primary
+    def sticky():
+        config = current_app.config
+        return app_cache("db_sticky", maxsize=config["SQLALCHEMY_REPLICA_STICKY_CACHE_SIZE"], ttl=config["SQLALCHEMY_REPLICA_STICKY_SECONDS"])
+
+    def client_key():
+        return request.headers.get("Authorization") or request.remote_addr
+
+    @app.before_request
+    def _route_request():
+        g.db_replica = None
+        view = app.view_functions.get(request.endpoint)
+        if view is None or not _is_read_only(view):
+            return
+        # Checked across workers through the cookie, and within this one for cookieless clients
+        until = request.cookies.get(app.config["SQLALCHEMY_REPLICA_STICKY_COOKIE"], type=float)
+        if (until and until > time.time()) or sticky().get(client_key()):
+            return
+        replicas = [engine for key, engine in db.engines.items() if key and key.startswith(REPLICA_BIND_PREFIX)]
+        g.db_replica = random.choice(replicas)
+
+    @app.after_request
+    def _stick_to_primary(response):
+        if g.get("db_wrote"):
+            seconds = app.config["SQLALCHEMY_REPLICA_STICKY_SECONDS"]
+            sticky().set(client_key(), True)
+            response.set_cookie(
+                    app.config["SQLALCHEMY_REPLICA_STICKY_COOKIE"],
+                    str(time.time() + seconds),
+                    max_age=seconds,
+                    httponly=True)
+        return response
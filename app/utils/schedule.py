@@ -0,0 +1,66 @@
+import functools
+
+from datetime import datetime, timedelta
+from dateutil.relativedelta import relativedelta
+
+
+# Supported frequencies: (unit, step)
+FREQUENCIES = {
+    "daily": ("days", 1),
+    "weekly": ("days", 7),
+    "biweekly": ("days", 14),
+    "monthly": ("months", 1),
+    "quarterly": ("months", 3),
+    "semiannually": ("months", 6),
+    "yearly": ("months", 12)}
+
+
+class Schedule:
+    """Occurrences of a recurring expense: 'start_date' plus every multiple of the frequency step."""
+
+    def __init__(self, frequency="monthly", start_date=None):
+        self.frequency = frequency if frequency in FREQUENCIES else "monthly"
+        self.unit, self.step = FREQUENCIES[self.frequency]
+        self.start_date = start_date
+
+    def __repr__(self):
+        return f"{type(self).__name__}(frequency='{self.frequency}', start_date='{self.start_date}')"
+
+    def _first_index(self, start):
+        """Index of the first occurrence on or after 'start'."""
+        if start <= self.start_date:
+            return 0
+        if self.unit == "days":
+            return -(-(start - self.start_date).days // self.step)
+        months = (start.year - self.start_date.year) * 12 + (start.month - self.start_date.month)
+        index = max(months // self.step, 0)
+        while self._occurrence(index) < start:
+            index += 1
+        return index
+
+    def _occurrence(self, index):
+        if self.unit == "days":
+            return self.start_date + timedelta(days=index * self.step)
+        return self.start_date + relativedelta(months=index * self.step)
+
+    def occurrences(self, start, end):
+        """Yield the occurrences in ['start', 'end') without visiting earlier ones."""
+        index = self._first_index(start)
+        occurrence = self._occurrence(index)
+        while occurrence < end:
+            yield occurrence
+            index += 1
+            occurrence = self._occurrence(index)
+
+    def monthly_counts(self, year=None, month=None, months=12):
+        """Return the number of occurrences in each of the 'months' months starting at 'year'-'month'."""
+        counts = [0] * months
+        start = datetime(year, month, 1)
+        for occurrence in self.occurrences(start, start + relativedelta(months=months)):
+            counts[(occurrence.year - year) * 12 + occurrence.month - month] += 1
+        return counts
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_schedule(frequency="monthly", start_date=None):
+    return Schedule(frequency=frequency.strip().lower(), start_date=start_date)
@@ -0,0 +1,50 @@
+from functools import lru_cache
+from sqlalchemy import select
+
+
+### FORMATTING #################################################################
+
+@lru_cache(maxsize=4096)
+def format_date(value):
+    """Format a datetime as 'yyyy-mm-dd' (cached: the same dates repeat across rows)."""
+    return value.strftime("%Y-%m-%d")
+
+
+def format_timestamp(value):
+    """Format a naive UTC datetime as 'yyyy-mm-ddThh:mm:ssZ'."""
+    return value.isoformat(timespec="seconds") + "Z"
+
+
+def cents_to_float(value):
+    # Same float as 'float(Decimal)' of the amount: both are correctly rounded
+    return None if value is None else value / 100
+
+
+### SERIALIZER #################################################################
+
+class Serializer:
+    """Dump rows of selected columns into response dictionaries, without building ORM objects.
+
+    Each keyword maps a key of the dictionaries to a column expression, or to
+    a '(column, format)' pair whose function is applied to the column value.
+    """
+
+    def __init__(self, **fields):
+        self.keys = tuple(fields)
+        self.columns = tuple(
+                (field[0] if isinstance(field, tuple) else field).label(key) for key, field in fields.items())
+        self._formats = tuple(
+                (i, field[1]) for i, field in enumerate(fields.values()) if isinstance(field, tuple))
+
+    def select(self, stmt=None):
+        """Select the serialized columns, keeping the criteria and ordering of 'stmt' if given."""
+        return select(*self.columns) if stmt is None else stmt.with_only_columns(*self.columns)
+
+    def dump(self, row):
+        values = list(row)
+        for i, format in self._formats:
+            values[i] = format(values[i])
+        return dict(zip(self.keys, values))
+
+    def dump_all(self, rows):
+        return [self.dump(row) for row in rows]
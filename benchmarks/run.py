@@ -0,0 +1,309 @@
+"""Load benchmark of the API hot paths.
+
+Seeds a user with a configurable transaction history and measures the
+throughput and latency of login, transaction ingestion, transfer simulation,
+balance projection and transaction listing, either in-process ('create_app'
+against SQLite) or against a running server ('--url'). Results are written as JSON and can be
+compared with a previous run to catch regressions:
+
+    python benchmarks/run.py --history 10000 --output results.json
+    python benchmarks/run.py --history 10000 --baseline results.json
+"""
+
+### IMPORTS ####################################################################
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+### CLIENTS ####################################################################
+
+class InProcessClient:
+    """Send the requests to an application created with 'create_app'."""
+
+    def __init__(self, database_uri):
+        from sqlalchemy.pool import StaticPool
+
+        from app import create_app, db
+
+        class ConfigBenchmark:
+            SECRET_KEY = "benchmark"
+            SQLALCHEMY_DATABASE_URI = database_uri
+            MAIL_SUPPRESS_SEND = True
+            MAIL_DEFAULT_SENDER = "benchmark@example.com"
+            # The login scenario repeats the same credentials
+            LOGIN_RATE_LIMIT = 0
+            if database_uri == "sqlite://":
+                # Share the single in-memory database across threads
+                SQLALCHEMY_ENGINE_OPTIONS = {
+                        "poolclass": StaticPool,
+                        "connect_args": {"check_same_thread": False}}
+
+        self.app = create_app(ConfigBenchmark)
+        with self.app.app_context():
+            db.create_all()
+        self._client = self.app.test_client()
+
+    def request(self, method, path, payload=None, token=None):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        response = self._client.open(path, method=method, json=payload, headers=headers)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpClient:
+    """Send the requests to a running server."""
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+
+    def request(self, method, path, payload=None, token=None):
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        data = None if payload is None else json.dumps(payload).encode()
+        request = urllib.request.Request(self.url + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, _load_body(response.read())
+        except urllib.error.HTTPError as err:
+            return err.code, _load_body(err.read())
+
+
+def _load_body(body):
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+### SEEDING ####################################################################
+
+CATEGORIES = ("food", "transport", "rent", "utilities", "leisure", "health", "travel", "shopping")
+
+
+def generate_history(size, rng, days=365):
+    """Return 'size' transactions spread over the last 'days' days, oldest first."""
+    end = datetime.utcnow() - timedelta(minutes=10)
+    start = end - timedelta(days=days)
+    span = (end - start).total_seconds()
+    offsets = sorted(rng.random() * span for _ in range(size))
+    return [{
+            "amount": round(rng.lognormvariate(3, 1), 2),
+            "category": rng.choice(CATEGORIES),
+            "timestamp": (start + timedelta(seconds=offset)).strftime("%Y-%m-%dT%H:%M:%SZ")}
+            for offset in offsets]
+
+
+def seed(client, history, batch_size, rng):
+    """Register a benchmark user, load its transaction history and return its credentials and token."""
+    credentials = {"email": f"benchmark-{rng.getrandbits(48):x}@example.com", "password": "benchmark"}
+    status, body = client.request("POST", "/api/auth/register", payload={
+            "name": "Benchmark", **credentials, "balance": 10_000_000.0})
+    _expect(status, 201, body, "register")
+    status, body = client.request("POST", "/api/auth/login", payload=credentials)
+    _expect(status, 200, body, "login")
+    token = body["token"]
+    transactions = generate_history(history, rng)
+    for i in range(0, len(transactions), batch_size):
+        status, body = client.request("POST", "/api/transactions/batch", payload=transactions[i:i + batch_size], token=token)
+        _expect(status, 201, body, "seed transactions")
+    for name, frequency in (("Rent", "monthly"), ("Gym", "weekly"), ("Insurance", "yearly"), ("Phone", "monthly")):
+        status, body = client.request("POST", "/api/recurring-expenses", payload={
+                "expense_name": name,
+                "amount": round(rng.uniform(10, 1000), 2),
+                "frequency": frequency,
+                "start_date": "2024-01-01"}, token=token)
+        _expect(status, 201, body, "seed recurring expenses")
+    return credentials, token
+
+
+def _expect(status, expected, body, step):
+    if status != expected:
+        raise SystemExit(f"{step} failed with status {status}: {body}")
+
+
+### SCENARIOS ##################################################################
+
+def scenarios(credentials, token, rng):
+    """Return the benchmarked requests as 'name: callable(client)'."""
+    lock = threading.Lock()
+
+    def amount():
+        with lock:
+            return round(rng.lognormvariate(3, 1), 2)
+
+    def category():
+        with lock:
+            return rng.choice(CATEGORIES)
+
+    return {
+        "login": lambda client: client.request(
+                "POST", "/api/auth/login", payload=credentials),
+        "transaction": lambda client: client.request(
+                "POST", "/api/transactions", payload={"amount": amount(), "category": category()}, token=token),
+        "transfer_simulate": lambda client: client.request(
+                "POST", "/api/transfers/simulate", payload={"source_currency": "USD", "target_currency": "EUR", "amount": amount()}, token=token),
+        "projection": lambda client: client.request(
+                "GET", "/api/recurring-expenses/projection", token=token),
+        "transaction_list": lambda client: client.request(
+                "GET", "/api/transactions?limit=1000", token=token)}
+
+
+def run_scenario(client, send, requests, concurrency):
+    """Send 'requests' requests over 'concurrency' threads and summarise their latency."""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    remaining = iter(range(requests))
+
+    def worker():
+        nonlocal errors
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            started = time.perf_counter()
+            status, _ = send(client)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if not 200 <= status < 300:
+                    errors += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+    return summarise(latencies, errors, duration)
+
+
+def summarise(latencies, errors, duration):
+    latencies = sorted(latency * 1000 for latency in latencies)
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(round(p / 100 * (len(latencies) - 1))))]
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / duration, 2) if duration else None,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 3),
+            "p50": round(percentile(50), 3),
+            "p95": round(percentile(95), 3),
+            "p99": round(percentile(99), 3),
+            "max": round(latencies[-1], 3)}}
+
+
+### REGRESSIONS ################################################################
+
+def compare(results, baseline, tolerance):
+    """Return the scenarios whose p95 latency or throughput got worse than 'tolerance' against the baseline."""
+    regressions = []
+    for name, result in results["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        if result["latency_ms"]["p95"] > previous["latency_ms"]["p95"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['latency_ms']['p95']} ms -> {result['latency_ms']['p95']} ms")
+        if result["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']} -> {result['throughput_rps']} req/s")
+        if result["errors"] > previous["errors"]:
+            regressions.append(f"{name}: errors {previous['errors']} -> {result['errors']}")
+    return regressions
+
+
+### MAIN #######################################################################
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Benchmark a running server instead of an in-process application.")
+    parser.add_argument("--database", help="Database URI of the in-process application ('sqlite://' for in-memory; defaults to a temporary SQLite file).")
+    parser.add_argument("--history", type=int, default=1000, help="Number of transactions in the seeded user's history (default: 1000).")
+    parser.add_argument("--seed-batch-size", type=int, default=10000, help="Transactions per seeding batch request (default: 10000).")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario (default: 200).")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent clients per scenario (default: 1).")
+    parser.add_argument("--scenario", action="append", choices=("login", "transaction", "transfer_simulate", "projection", "transaction_list"),
+                        help="Scenario to run (repeatable; default: all).")
+    parser.add_argument("--random-seed", type=int, default=0, help="Seed of the generated data (default: 0).")
+    parser.add_argument("--output", help="Write the results to this JSON file (default: standard output).")
+    parser.add_argument("--baseline", help="Results of a previous run to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression against the baseline (default: 0.25).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = random.Random(args.random_seed)
+    if args.url:
+        client = HttpClient(args.url)
+        target = args.url
+    else:
+        database_uri = args.database
+        if database_uri is None:
+            fd, path = tempfile.mkstemp(prefix="benchmark-", suffix=".db")
+            os.close(fd)
+            database_uri = f"sqlite:///{path}"
+        client = InProcessClient(database_uri)
+        target = database_uri
+
+    started = time.perf_counter()
+    credentials, token = seed(client, args.history, args.seed_batch_size, rng)
+    seed_duration = time.perf_counter() - started
+    print(f"Seeded {args.history} transactions in {seed_duration:.1f} s", file=sys.stderr)
+
+    results = {
+        "meta": {
+            "target": target,
+            "history": args.history,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed_seconds": round(seed_duration, 3),
+            "python": platform.python_version(),
+            "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")},
+        "results": {}}
+    for name, send in scenarios(credentials, token, rng).items():
+        if args.scenario and name not in args.scenario:
+            continue
+        results["results"][name] = result = run_scenario(client, send, args.requests, args.concurrency)
+        print(f"{name}: {result['throughput_rps']} req/s, p95 {result['latency_ms']['p95']} ms, {result['errors']} errors", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        for setting in ("history", "concurrency"):
+            if baseline.get("meta", {}).get(setting) != results["meta"][setting]:
+                print(f"WARNING the baseline was run with a different '{setting}'", file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
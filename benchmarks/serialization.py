@@ -0,0 +1,98 @@
+"""Micro-benchmark of the transaction list serialization.
+
+Compares, on a seeded in-memory SQLite database, the time to turn a page of
+transactions into a JSON response body through the ORM objects and
+'generate_json' (the previous path) and through the column serializer,
+with each available JSON backend:
+
+    python benchmarks/serialization.py --rows 1000 --repeat 50
+"""
+
+### IMPORTS ####################################################################
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import Transaction, transaction_serializer, User
+from app.utils.json_provider import JSON_PROVIDERS, JSONProvider, orjson
+
+
+### SETUP ######################################################################
+
+class ConfigBenchmark:
+    SECRET_KEY = "benchmark"
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    MAIL_SUPPRESS_SEND = True
+    MAIL_DEFAULT_SENDER = "benchmark@example.com"
+    BCRYPT_LOG_ROUNDS = 4
+
+
+def seed(rows, rng):
+    user = User(name="Benchmark", email="benchmark@example.com", password="benchmark", balance=10 ** 9)
+    user.add()
+    start = datetime.utcnow() - timedelta(days=365)
+    transactions = [
+            Transaction(
+                amount=round(rng.lognormvariate(3, 1), 2),
+                category=rng.choice(("groceries", "rent", "travel", "utilities")),
+                timestamp=start + timedelta(seconds=rng.randint(0, 365 * 86400)))
+            for _ in range(rows)]
+    Transaction.add_all(user=user, transactions=transactions)
+    db.session.commit()
+    return user
+
+
+### PATHS ######################################################################
+
+def orm_path(stmt, provider):
+    transactions = db.session.execute(stmt).scalars().all()
+    return provider.dumps({"data": [transaction.generate_json() for transaction in transactions]})
+
+
+def serializer_path(stmt, provider):
+    rows = db.session.execute(transaction_serializer.select(stmt)).all()
+    return provider.dumps({"data": transaction_serializer.dump_all(rows)})
+
+
+def measure(path, stmt, provider, repeat):
+    """Return the best time (ms) of 'repeat' runs, with a fresh session each run."""
+    timings = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        path(stmt, provider)
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(min(timings), 3)
+
+
+### MAIN #######################################################################
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000, help="Transactions in the serialized page (default: 1000).")
+    parser.add_argument("--repeat", type=int, default=50, help="Runs per measurement; the best is kept (default: 50).")
+    args = parser.parse_args(argv)
+
+    app = create_app(ConfigBenchmark)
+    with app.app_context():
+        db.create_all()
+        user = seed(args.rows, random.Random(0))
+        stmt = Transaction.filter_transactions_by(user=user)
+        backends = [name for name in JSON_PROVIDERS if name != "orjson" or orjson is not None]
+        results = {"rows": args.rows, "orm_json_ms": measure(orm_path, stmt, JSONProvider(app), args.repeat)}
+        for backend in backends:
+            results[f"serializer_{backend}_ms"] = measure(serializer_path, stmt, JSON_PROVIDERS[backend](app), args.repeat)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Micro-benchmark of the request validation path.
+
+Times, per request payload, loading it through a schema created for the
+request and through one shared schema instance, and the shared load
+followed by the construction of the model the view builds from it:
+
+    python benchmarks/validation.py --number 20000
+"""
+
+### IMPORTS ####################################################################
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.models import Alert, RecurringExpense, Transaction
+from app.schemas import AlertSchema, RecurringExpenseSchema, TransactionSchema, TransferSchema
+
+
+### CASES ######################################################################
+
+class ConfigBenchmark:
+    SECRET_KEY = "benchmark"
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+
+
+# name: (schema class, payload, model built from the validated data, load arguments)
+CASES = {
+    "transaction": (
+        TransactionSchema,
+        {"amount": 42.5, "category": "groceries", "timestamp": "2024-03-16T17:34:41Z"},
+        Transaction,
+        {}),
+    "transaction_batch_100": (
+        TransactionSchema,
+        [{"amount": 42.5, "category": "groceries", "timestamp": "2024-03-16T17:34:41Z"}] * 100,
+        None,
+        {"many": True}),
+    "recurring_expense": (
+        RecurringExpenseSchema,
+        {"expense_name": "rent", "amount": 950.0, "frequency": "monthly", "start_date": "2024-03-16"},
+        RecurringExpense,
+        {}),
+    "alert": (
+        AlertSchema,
+        {"target_amount": 1000.0, "alert_threshold": 100.0, "balance_drop_threshold": 50.0},
+        Alert,
+        {}),
+    "transfer": (
+        TransferSchema,
+        {"source_currency": "USD", "target_currency": "EUR", "amount": 100.0},
+        None,
+        {})}
+
+
+def measure(function, number, repeat=5):
+    """Return the best time per call (µs) over 'repeat' runs of 'number' calls."""
+    return round(min(timeit.repeat(function, number=number, repeat=repeat)) / number * 1e6, 2)
+
+
+### MAIN #######################################################################
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000, help="Calls per run; the best of 5 runs is kept (default: 20000).")
+    args = parser.parse_args(argv)
+
+    app = create_app(ConfigBenchmark)
+    results = {}
+    with app.app_context():
+        for name, (schema_class, payload, model, kwargs) in CASES.items():
+            schema = schema_class()
+            number = max(args.number // len(payload), 1) if isinstance(payload, list) else args.number
+            result = results[name] = {
+                    "schema_per_request_us": measure(lambda: schema_class().load(payload, **kwargs), number),
+                    "shared_schema_us": measure(lambda: schema.load(payload, **kwargs), number)}
+            if model is not None:
+                result["shared_schema_and_model_us"] = measure(lambda: model(**schema.load(payload, **kwargs)), number)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
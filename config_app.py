@@ -7,6 +7,27 @@ class ConfigDevelopment:
     SQLALCHEMY_TRACK_MODIFICATIONS = False  
     DEBUG = True
     TESTING = False
+    # Verified JWT cache (entries and seconds)
+    AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", default=4096))
+    AUTH_TOKEN_CACHE_TTL = int(os.getenv("AUTH_TOKEN_CACHE_TTL", default=300))
+    # Password hashing: bcrypt cost (existing hashes are upgraded on login) and size of the hashing process pool
+    # of each gunicorn worker (0 hashes on the request thread; the workers already spread over the cores)
+    BCRYPT_LOG_ROUNDS = int(os.getenv("BCRYPT_LOG_ROUNDS", default=12))
+    BCRYPT_POOL_SIZE = int(os.getenv("BCRYPT_POOL_SIZE", default=1))
+    # Login attempts allowed per email address and period (seconds)
+    LOGIN_RATE_LIMIT = int(os.getenv("LOGIN_RATE_LIMIT", default=10))
+    LOGIN_RATE_LIMIT_PERIOD = int(os.getenv("LOGIN_RATE_LIMIT_PERIOD", default=60))
+    # Balance projection cache (entries and seconds)
+    PROJECTION_CACHE_SIZE = int(os.getenv("PROJECTION_CACHE_SIZE", default=4096))
+    PROJECTION_CACHE_TTL = int(os.getenv("PROJECTION_CACHE_TTL", default=3600))
+    # Maximum number of transactions per batch request
+    TRANSACTION_BATCH_MAX_SIZE = int(os.getenv("TRANSACTION_BATCH_MAX_SIZE", default=10000))
+    # Maximum number of transfers per batch simulation
+    TRANSFER_BATCH_MAX_SIZE = int(os.getenv("TRANSFER_BATCH_MAX_SIZE", default=10000))
+    # Score new transactions in the background ('flask transaction score') unless '?async=false'
+    TRANSACTION_ASYNC_SCORING = os.getenv("TRANSACTION_ASYNC_SCORING", default="false").lower() in ("1", "true", "yes")
+    # Age in days of the transactions moved to the archive table ('flask transaction archive')
+    TRANSACTION_ARCHIVE_AFTER_DAYS = int(os.getenv("TRANSACTION_ARCHIVE_AFTER_DAYS", default=365))
     # SMTP Server Config
     MAIL_SERVER = "smtp"
     MAIL_PORT = 1025
@@ -15,3 +36,33 @@ class ConfigDevelopment:
     MAIL_USERNAME = None
     MAIL_PASSWORD = None
     MAIL_DEFAULT_SENDER = os.getenv("ADMIN_EMAIL", default="example@example.com")
+    # Email Outbox Config
+    MAIL_OUTBOX_BATCH_SIZE = int(os.getenv("MAIL_OUTBOX_BATCH_SIZE", default=100))
+    MAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("MAIL_OUTBOX_MAX_ATTEMPTS", default=5))
+    MAIL_OUTBOX_RETRY_DELAY = int(os.getenv("MAIL_OUTBOX_RETRY_DELAY", default=30))
+    MAIL_OUTBOX_POLL_INTERVAL = float(os.getenv("MAIL_OUTBOX_POLL_INTERVAL", default=5))
+    # JSON encoder: 'json' (standard library) or 'orjson' (requires the orjson package)
+    JSON_BACKEND = os.getenv("JSON_BACKEND", default="json")
+    # Read replicas: comma-separated database URIs serving the read-only views
+    SQLALCHEMY_REPLICA_URIS = [uri.strip() for uri in os.getenv("SQLALCHEMY_REPLICA_URIS", default="").split(",") if uri.strip()]
+    SQLALCHEMY_REPLICA_STICKY_SECONDS = int(os.getenv("SQLALCHEMY_REPLICA_STICKY_SECONDS", default=5))
+    # Lazy relationship loads: 'warn', 'raise' or empty to allow them
+    SQLALCHEMY_LAZY_LOAD_GUARD = os.getenv("SQLALCHEMY_LAZY_LOAD_GUARD") or None
+    # Instrumentation: Prometheus metrics on '/metrics' and profiles of the requests slower than PROFILER_SLOW_REQUEST_MS
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", default="false").lower() in ("1", "true", "yes")
+    METRICS_N_PLUS_ONE_THRESHOLD = int(os.getenv("METRICS_N_PLUS_ONE_THRESHOLD", default=10))
+    PROFILER_SLOW_REQUEST_MS = float(os.getenv("PROFILER_SLOW_REQUEST_MS", default=0)) or None
+    PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", default=5))
+    PROFILER_DIR = os.getenv("PROFILER_DIR")
+
+
+class ConfigProduction(ConfigDevelopment):
+    DEBUG = False
+    # Connection pool (per worker process): sized to the worker threads
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", default=os.getenv("GUNICORN_THREADS", default=4))),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", default=4)),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", default=10)),
+        # Recycle connections before MySQL's wait_timeout drops them
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", default=1800)),
+        "pool_pre_ping": True}
@@ -0,0 +1,22 @@
+import multiprocessing
+import os
+
+
+# Server socket
+bind = os.getenv("GUNICORN_BIND", default="0.0.0.0:5000")
+
+# Worker processes: threaded workers overlap the database and SMTP waits
+workers = int(os.getenv("GUNICORN_WORKERS", default=multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", default=4))
+worker_class = "gthread"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", default=30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", default=5))
+
+# Restart workers periodically to bound memory growth
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", default=10000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", default=1000))
+
+# Logging
+accesslog = "-"
+errorlog = "-"
+
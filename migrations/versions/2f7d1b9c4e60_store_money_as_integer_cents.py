@@ -0,0 +1,55 @@
+"""Store money as integer cents
+
+Revision ID: 2f7d1b9c4e60
+Revises: 9a4f2c6e8b31
+Create Date: 2026-10-18 15:21:36.904412
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f7d1b9c4e60'
+down_revision = '9a4f2c6e8b31'
+branch_labels = None
+depends_on = None
+
+
+# Money columns, now integer numbers of cents
+MONEY_COLUMNS = {
+    'users': ('balance',),
+    'recurring_expenses': ('amount',),
+    'alerts': ('target_amount', 'alert_threshold', 'balance_drop_threshold'),
+    'transactions': ('amount',),
+    'spending_statistics': ('total',),
+    'spending_buckets': ('total',),
+}
+# Sums of squared amounts, now in cents squared
+SUM_SQUARES_TABLES = ('spending_statistics', 'spending_buckets')
+
+
+def upgrade():
+    for table, columns in MONEY_COLUMNS.items():
+        op.execute(f"UPDATE {table} SET " + ", ".join(f"{column} = ROUND({column} * 100)" for column in columns))
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column,
+                       existing_type=sa.Float(),
+                       type_=sa.BigInteger(),
+                       existing_nullable=False)
+    for table in SUM_SQUARES_TABLES:
+        op.execute(f"UPDATE {table} SET sum_squares = sum_squares * 10000")
+
+
+def downgrade():
+    for table in SUM_SQUARES_TABLES:
+        op.execute(f"UPDATE {table} SET sum_squares = sum_squares / 10000")
+    for table, columns in MONEY_COLUMNS.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column,
+                       existing_type=sa.BigInteger(),
+                       type_=sa.Float(),
+                       existing_nullable=False)
+        op.execute(f"UPDATE {table} SET " + ", ".join(f"{column} = {column} / 100.0" for column in columns))
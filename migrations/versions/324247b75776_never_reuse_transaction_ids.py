@@ -0,0 +1,39 @@
+"""Never reuse transaction ids
+
+Revision ID: 324247b75776
+Revises: 4a30d8e96634
+Create Date: 2026-10-18 16:02:11.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '324247b75776'
+down_revision = '4a30d8e96634'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Without AUTOINCREMENT, SQLite hands out again the ids of rows moved to
+    # the archive once they were the highest. The other databases never do.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('transactions', schema=None, recreate='always', table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        pass
+    # Start after every id already handed out, archived ones included
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'transactions'")
+    op.execute(
+        "INSERT INTO sqlite_sequence (name, seq) "
+        "SELECT 'transactions', MAX(id) FROM "
+        "(SELECT id FROM transactions UNION ALL SELECT id FROM transactions_archive) "
+        "HAVING MAX(id) IS NOT NULL")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('transactions', schema=None, recreate='always', table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+        pass
@@ -29,6 +29,10 @@ wait_for_db_service "$MYSQL_HOST" "$MYSQL_PORT"
 echo "Applying database migrations..."
 flask db upgrade
 
-# Start Flask application
+# Start Flask application (APP_SERVER=flask runs the development server)
+if [ "${APP_SERVER:-gunicorn}" = "flask" ]; then
+  echo "Starting Flask development server..."
+  exec flask run --host=0.0.0.0 --port=5000
+fi
 echo "Starting Flask application..."
-exec flask run --host=0.0.0.0 --port=5000
+exec gunicorn -c gunicorn.conf.py wsgi:app
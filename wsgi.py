@@ -0,0 +1,5 @@
+from app import create_app
+from config_app import ConfigProduction
+
+# Entry point of the production server (e.g. 'gunicorn -c gunicorn.conf.py wsgi:app')
+app = create_app(config_obj=ConfigProduction)